@@ -0,0 +1,94 @@
+import argparse
+import time
+import psynlp.helpers.builtins as builtins
+
+parser = argparse.ArgumentParser(
+    description='Times one of the core stages, for a given language and quality.')
+parser.add_argument('-b', '--benchmark', default='construction',
+                    help='Name of the benchmark (Default: construction)')
+parser.add_argument('-l', '--language', default='english',
+                    help='Name of the language (Default: english)')
+parser.add_argument('-q', '--quality', default='high',
+                    help='Size of the training data (Default: high)')
+parser.add_argument('-r', '--repeat', type=int, default=1,
+                    help='Number of times to repeat the benchmark (Default: 1)')
+
+import tempfile
+from psynlp.core.ostia import OSTIA
+from psynlp.helpers.alignments import AlignmentTable
+from psynlp.helpers.importers import fetch_input_output_pairs, training_filepath
+
+
+def construction(T):
+    """
+    Times forming the io and the input-only digraphs of OSTIA
+    """
+    ostia = OSTIA.__new__(OSTIA)
+    input_words = [input_word for (input_word, _, _) in T]
+
+    start = time.perf_counter()
+    graph = ostia.form_io_digraph(T)
+    io_time = time.perf_counter() - start
+    print("form_io_digraph    : {:.3f}s ({} states, {} arcs)".format(
+        io_time, len(graph.states()), len(graph.arcs())))
+
+    start = time.perf_counter()
+    graph = ostia.form_input_digraph(input_words)
+    input_time = time.perf_counter() - start
+    print("form_input_digraph : {:.3f}s ({} states, {} arcs)".format(
+        input_time, len(graph.states()), len(graph.arcs())))
+
+
+def training(T):
+    """
+    Times training OSTIA on the io pairs, and walking its states the way the
+    merge loop does (first, next, ..., last)
+    """
+    start = time.perf_counter()
+    ostia = OSTIA(T)
+    training_time = time.perf_counter() - start
+    print("OSTIA(T)           : {:.3f}s ({} states)".format(
+        training_time, len(ostia.graph.states())))
+
+    start = time.perf_counter()
+    q, steps = ostia.first(), 0
+    while q != ostia.last():
+        q, steps = ostia.next(q), steps + 1
+    walk_time = time.perf_counter() - start
+    print("first/next walk    : {:.3f}s ({} steps)".format(walk_time, steps))
+
+
+def alignment(T):
+    """
+    Times aligning the pairs of the training file in one process, across a
+    pool of processes, and loading the alignments back from the cache
+    """
+    filepath = training_filepath(args.language, args.quality)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for (name, table) in [('one process', AlignmentTable(processes=1)),
+                              ('process pool', AlignmentTable(cache_dir, None)),
+                              ('cache', AlignmentTable(cache_dir))]:
+            start = time.perf_counter()
+            table.load(filepath)
+            load_time = time.perf_counter() - start
+            print("{:<19}: {:.3f}s ({} pairs)".format(name, load_time, len(table)))
+
+
+BENCHMARKS = {'construction': construction, 'training': training,
+              'alignment': alignment}
+
+# Guarded, as the workers of the alignment pool re-import this script
+if __name__ == '__main__':
+    args = parser.parse_args()
+    builtins.init_verbose(False)
+
+    if args.benchmark not in BENCHMARKS:
+        print("Chosen benchmark ({}) is invalid. \n\nChoose one from {}.".format(
+            args.benchmark, sorted(BENCHMARKS)))
+        exit()
+
+    T = fetch_input_output_pairs(language=args.language, quality=args.quality)
+    print("{} on {}-train-{} ({} pairs)".format(
+        args.benchmark, args.language, args.quality, len(T)))
+    for _ in range(args.repeat):
+        BENCHMARKS[args.benchmark](T)
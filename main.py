@@ -10,31 +10,61 @@ parser.add_argument('-l', '--language', default='english',
                     help='Name of the language (Default: english)')
 parser.add_argument('-q', '--quality', default='low',
                     help='Size of the training data (Default: low)')
+parser.add_argument('-m', '--model-dir', default=None,
+                    help='Directory to save / load trained models in (ostia pipeline only)')
+parser.add_argument('-a', '--alignment-dir', default=None,
+                    help='Directory to save / load the alignments of the training data in')
+parser.add_argument('-j', '--processes', type=int, default=1,
+                    help='Number of processes aligning the training data (Default: 1)')
+parser.add_argument('-b', '--basis', default=None, choices=['pac', 'canonical'],
+                    help='Implication basis the clusters come from (pac_ostia pipeline only, Default: pac)')
 parser.add_argument('-v', '--verbose', action="count", default=False, help='Prints verbose output if specified')
-args = parser.parse_args()
-builtins.init_verbose(args.verbose)
-
-PIPELINES = [f.rstrip('.py') for f in listdir(
-    'psynlp/pipelines') if f.endswith('.py')]
-LANGUAGES = [f.split('-train-high')[0]
-             for f in listdir('psynlp/data') if f.endswith('high')]
-QUALITIES = ['low', 'medium', 'high']
-
-if args.pipeline not in PIPELINES:
-    print("Chosen pipeline ({}) is invalid. \n\nChoose one from {}.".format(
-        args.pipeline, PIPELINES))
-    exit()
-
-if args.language not in LANGUAGES:
-    print("Chosen language ({}) is invalid. \n\nChoose one from {}.".format(
-        args.language, LANGUAGES))
-    exit()
-
-if args.quality not in QUALITIES:
-    print("Chosen quality ({}) is invalid. \n\nChoose one from {}.".format(
-        args.quality, QUALITIES))
-    exit()
-
-import importlib
-pipeline = importlib.import_module("psynlp.pipelines.{}".format(args.pipeline))
-pipeline.fetch_accuracy(language=args.language, quality=args.quality)
+# Guarded, as the workers of the alignment pool re-import this script
+if __name__ == '__main__':
+    args = parser.parse_args()
+    builtins.init_verbose(args.verbose)
+
+    PIPELINES = [f.rstrip('.py') for f in listdir(
+        'psynlp/pipelines') if f.endswith('.py')]
+    LANGUAGES = [f.split('-train-high')[0]
+                 for f in listdir('psynlp/data') if f.endswith('high')]
+    QUALITIES = ['low', 'medium', 'high']
+
+    if args.pipeline not in PIPELINES:
+        print("Chosen pipeline ({}) is invalid. \n\nChoose one from {}.".format(
+            args.pipeline, PIPELINES))
+        exit()
+
+    if args.language not in LANGUAGES:
+        print("Chosen language ({}) is invalid. \n\nChoose one from {}.".format(
+            args.language, LANGUAGES))
+        exit()
+
+    if args.quality not in QUALITIES:
+        print("Chosen quality ({}) is invalid. \n\nChoose one from {}.".format(
+            args.quality, QUALITIES))
+        exit()
+
+    if args.model_dir is not None and args.pipeline != 'ostia':
+        print("Saving models ({}) is only supported by the ostia pipeline.".format(
+            args.model_dir))
+        exit()
+
+    if args.basis is not None and args.pipeline != 'pac_ostia':
+        print("Choosing the basis ({}) is only supported by the pac_ostia pipeline.".format(
+            args.basis))
+        exit()
+
+    import importlib
+    from psynlp.helpers import alignments
+    alignments.table.cache_dir = args.alignment_dir
+    alignments.table.processes = args.processes
+    pipeline = importlib.import_module("psynlp.pipelines.{}".format(args.pipeline))
+    if args.model_dir is not None:
+        pipeline.fetch_accuracy(language=args.language, quality=args.quality,
+                                model_dir=args.model_dir)
+    elif args.basis is not None:
+        pipeline.fetch_accuracy(language=args.language, quality=args.quality,
+                                basis=args.basis)
+    else:
+        pipeline.fetch_accuracy(language=args.language, quality=args.quality)
@@ -0,0 +1,140 @@
+"""
+Contains the index of the clusters of a metadata, to find the ones closest to
+a word, and the cache of the per-cluster models shared by the pipelines.
+"""
+
+from ..core.ostia import OSTIA
+from ..helpers.bktree import BKTree
+from ..helpers.cache import LRUCache
+from ..helpers.text import edit_distance, levenshtein_bounded
+
+
+class ClusterIndex(object):
+    """
+    Indexes the words of all the clusters of a metadata group in a BK-tree,
+    each word labelled with its clusters. A single query then gives the
+    clusters that OSTIA.matches_any_path would score the best, as when an
+    OSTIA is trained and matched on each cluster.
+    """
+
+    def __init__(self, cluster, models=None):
+        """
+        Parameters:
+        -----------------------------------
+        cluster : iterable
+            (antecedent_attrs, consequent_attrs) pairs, the consequent_attrs
+            being the words of a cluster
+        models : list[OSTIA]
+            OSTIA trained on the words of each cluster, in the same order.
+            They are trained here if not given.
+        """
+        self.clusters = list(cluster)
+        if models is None:
+            models = [OSTIA(cluster_words) for (_, cluster_words) in self.clusters]
+        self.models = list(models)
+        self.alphabet = set()
+        self.tree = BKTree(edit_distance, levenshtein_bounded)
+
+        for (position, ostia) in enumerate(self.models):
+            # Words ranked the way their paths are matched, end marker left out
+            for (rank, word) in enumerate(ostia.graph.path_index(0, -1).words):
+                word = word[:-1]
+                self.alphabet.update(word)
+                self.tree.add(word, (position, rank))
+
+    def closest(self, source):
+        """
+        Finds the clusters with the closest words to the source
+        Parameters:
+        -----------------------------------
+        source : str
+            The word to be matched
+
+        Returns:
+        -----------------------------------
+        min_score, matches : tuple
+            The least matches_any_path score among the clusters, and a list of
+            (position, closest_word) tuples of the clusters having that score,
+            in the order of the clusters
+        """
+        # The aligned distance of matches_any_path is the plain edit distance,
+        # unless '_' (a gap for align) is in the words
+        if '_' in source or '_' in self.alphabet:
+            scores = [ostia.matches_any_path(source) for ostia in self.models]
+            min_score = min(score for (score, _) in scores)
+            return((min_score, [(position, closest_word)
+                                for (position, (score, closest_word)) in enumerate(scores)
+                                if score == min_score]))
+
+        distance, matches = self.tree.search(source, len(source) * len(source))
+        if not matches:
+            return((len(source), [(position, source)
+                                  for position in range(len(self.clusters))]))
+
+        closest_words = {}
+        for (word, labels) in matches:
+            for (position, rank) in labels:
+                if position not in closest_words or rank < closest_words[position][0]:
+                    closest_words[position] = (rank, word)
+        return((float(distance) / len(source),
+                [(position, closest_words[position][1])
+                 for position in sorted(closest_words)]))
+
+
+class ModelCache(object):
+    """
+    Holds the OSTIA trained on each (metadata, cluster words) and the cluster
+    index of each (metadata, cluster object), so that they are trained / built once
+    and then shared by every evaluation loop and inference call.
+    """
+
+    def __init__(self, maxsize=4096):
+        """
+        Parameters:
+        -----------------------------------
+        maxsize : int
+            Maximum number of models (and of cluster indexes) to keep
+        """
+        self._models = LRUCache(maxsize)
+        self._indexes = LRUCache(maxsize)
+
+    def model(self, metadata, cluster_words):
+        """
+        Gives the OSTIA trained on the words of a cluster of a metadata
+        """
+        key = (metadata, tuple(cluster_words))
+        ostia = self._models.get(key)
+        if ostia is None:
+            ostia = OSTIA(key[1])
+            self._models.put(key, ostia)
+        return(ostia)
+
+    def cluster_index(self, metadata, cluster):
+        """
+        Gives the ClusterIndex of the clusters of a metadata, reusing the
+        models of the clusters already trained. Indexes are kept per cluster
+        object, so that a query doesn't go through all the words of the
+        metadata group; the object is held along with its index, so that its
+        id isn't reused while the index is cached.
+        """
+        key = (metadata, id(cluster))
+        entry = self._indexes.get(key)
+        if entry is None or entry[0] is not cluster:
+            clusters = [(tuple(antecedent_attrs), tuple(consequent_attrs))
+                        for (antecedent_attrs, consequent_attrs) in cluster]
+            entry = (cluster, ClusterIndex(
+                clusters, [self.model(metadata, cluster_words)
+                           for (_, cluster_words) in clusters]))
+            self._indexes.put(key, entry)
+        return(entry[1])
+
+    def clear(self):
+        """
+        Drops all the cached models and indexes
+        """
+        self._models.clear()
+        self._indexes.clear()
+
+
+# The cache shared by the pipelines
+models = ModelCache()
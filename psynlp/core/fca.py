@@ -12,6 +12,392 @@ import json
 import itertools
 import networkx as nx
 from ..core import oracle
+from ..helpers.cache import LRUCache
+
+
+def bit_indices(mask):
+    """
+    Gives the indices of the bits set in a bitmask, in increasing order
+    """
+    bits = bin(mask)[:1:-1]
+    index = bits.find('1')
+    while index != -1:
+        yield index
+        index = bits.find('1', index + 1)
+
+
+def next_closure(closure, size):
+    """
+    Ganter's NextClosure: enumerates every closed set of a closure operator
+    exactly once, in lectic order, the sets being bitmasks of size elements.
+    Each closed set is found from the previous one by closing it with one
+    more element, and kept only if that adds no element of a lower index.
+    Parameters:
+    -----------------------------------
+    closure : function
+        Closure operator, from a bitmask to the bitmask of its closure
+    size : int
+        Number of elements
+
+    Returns:
+    -----------------------------------
+    closed_sets : generator
+        The bitmasks of the closed sets, the closure of the empty set first
+    """
+    everything = (1 << size) - 1
+    closed = closure(0)
+    yield closed
+    while closed != everything:
+        for index in range(size - 1, -1, -1):
+            bit = 1 << index
+            if closed & bit:
+                closed ^= bit
+                continue
+            candidate = closure(closed | bit)
+            if not candidate & ~closed & (bit - 1):
+                closed = candidate
+                break
+        yield closed
+
+
+class BitImplications(object):
+    """
+    Implications between bitmasks of elements, indexed by the elements of
+    their premises, so that closures are computed with LinClosure: each
+    implication counts the elements of its premise not yet in the set, and
+    fires when its count drops to zero. Implications are known by the index
+    add gives them, and the slots of the discarded ones are left empty.
+    """
+
+    def __init__(self):
+        self.premises = []
+        self.consequences = []
+        self._sizes = []
+        self._discarded = 0
+        # elements some implication may add, and elements of some premise,
+        # None until recomputed
+        self._union = 0
+        self._premised = 0
+        # implications by element of their premise, and with an empty premise
+        self._by_element = {}
+        self._unconditional = []
+
+    def add(self, premise, consequence):
+        """
+        Adds the implication premise -> consequence, both bitmasks, and gives
+        its index
+        """
+        index = len(self.premises)
+        self.premises.append(premise)
+        self.consequences.append(consequence)
+        if self._union is not None:
+            self._union |= consequence
+        if self._premised is not None:
+            self._premised |= premise
+        size = 0
+        for element in bit_indices(premise):
+            self._by_element.setdefault(element, []).append(index)
+            size += 1
+        self._sizes.append(size)
+        if size == 0:
+            self._unconditional.append(index)
+        return(index)
+
+    def discard(self, index):
+        """
+        Removes the implication of the given index
+        """
+        premise = self.premises[index]
+        if premise is None:
+            return
+        for element in bit_indices(premise):
+            self._by_element[element].remove(index)
+        if premise == 0:
+            self._unconditional.remove(index)
+        self.premises[index] = self.consequences[index] = None
+        self._discarded += 1
+        self._union = self._premised = None
+
+    def union(self):
+        """
+        Gives the bitmask of the elements some implication may add
+        """
+        if self._union is None:
+            self._union = 0
+            for consequence in self.consequences:
+                if consequence is not None:
+                    self._union |= consequence
+        return(self._union)
+
+    def premised(self):
+        """
+        Gives the bitmask of the elements of some premise
+        """
+        if self._premised is None:
+            self._premised = 0
+            for premise in self.premises:
+                if premise is not None:
+                    self._premised |= premise
+        return(self._premised)
+
+    def closure(self, mask, proper=False):
+        """
+        Closes a bitmask under the implications
+        Parameters:
+        -----------------------------------
+        mask : int
+            Bitmask to be closed
+        proper : bool
+            If True, an implication only applies once its premise is a proper
+            subset of the set (the closure the canonical basis is built with)
+
+        Returns:
+        -----------------------------------
+        closure : int
+            The least superset of mask respecting the implications
+        """
+        premises, consequences = self.premises, self.consequences
+        by_element, union = self._by_element, self.union()
+        if not union & ~mask:
+            return(mask)
+        counts = list(self._sizes)
+        closed = mask
+        queue = list(bit_indices(mask))
+        ready = list(self._unconditional)
+        # implications whose premise is the whole set, waiting for it to grow
+        held = []
+        while True:
+            while ready or queue:
+                for index in ready:
+                    if proper and premises[index] == closed:
+                        held.append(index)
+                        continue
+                    added = consequences[index] & ~closed
+                    if added:
+                        closed |= added
+                        if not union & ~closed:
+                            # nothing left to add
+                            return(closed)
+                        queue.extend(bit_indices(added))
+                ready = []
+                if queue:
+                    for index in by_element.get(queue.pop(), ()):
+                        counts[index] -= 1
+                        if counts[index] == 0:
+                            ready.append(index)
+            ready = [index for index in held if premises[index] != closed]
+            if not ready:
+                return(closed)
+            held = [index for index in held if premises[index] == closed]
+
+    def violated(self, mask):
+        """
+        Gives the indices of the implications a bitmask doesn't respect, i.e
+        whose premise is within it but not their consequence. The premise
+        counts are run down by the elements of the mask, as in closure, but
+        nothing is added to it, and the elements of no premise are skipped.
+        """
+        consequences = self.consequences
+        if not self.union() & ~mask:
+            return
+        for index in self._unconditional:
+            if consequences[index] & ~mask:
+                yield index
+        by_element = self._by_element
+        counts = list(self._sizes)
+        for element in bit_indices(mask & self.premised()):
+            for index in by_element[element]:
+                counts[index] -= 1
+                if counts[index] == 0 and consequences[index] & ~mask:
+                    yield index
+
+    def __len__(self):
+        return(len(self.premises) - self._discarded)
+
+
+class BitRows(object):
+    """
+    One side (the objects or the attributes) of the relation of a concept.
+    Names are indexed in the order they are added, and each one has the
+    bitmask of the names of the other side it is related to.
+    """
+
+    def __init__(self):
+        self.index = {}
+        self.names = []
+        self.masks = []
+        self._sorted_names = []
+
+    def add(self, name):
+        """
+        Indexes a name, if it isn't already, and gives its index
+        """
+        index = self.index.get(name)
+        if index is None:
+            index = self.index[name] = len(self.names)
+            self.names.append(name)
+            self.masks.append(0)
+        return(index)
+
+    def sorted_names(self):
+        """
+        Gives a new list of all the names, sorted
+        """
+        if len(self._sorted_names) != len(self.names):
+            self._sorted_names = sorted(self.names)
+        return(list(self._sorted_names))
+
+    def mask(self, names):
+        """
+        Gives the bitmask of the given names
+        """
+        # Binary digits of the mask, most significant first, as setting them
+        # is cheaper than or-ing the bits of a large int one by one
+        digits = bytearray(b'0') * (len(self.names) + 1)
+        for name in names:
+            digits[-1 - self.index[name]] = ord('1')
+        return(int(digits, 2))
+
+    def names_of(self, mask):
+        """
+        Gives the set of names whose bits are set in a bitmask
+        """
+        names = self.names
+        return(set(names[index] for index in bit_indices(mask)))
+
+    def __len__(self):
+        return(len(self.names))
+
+
+class Hypothesis(object):
+    """
+    A set of implications (tuple(sorted(premise)), tuple(sorted(conclusion)))
+    between the names of one side of a concept, as horn1 builds them. The
+    implications are indexed as bitmasks in a BitImplications as they are
+    added or replaced, instead of being converted to sets on every check, so
+    that model checks and closures run with LinClosure's premise counts.
+    """
+
+    def __init__(self, rows, implications=()):
+        """
+        Parameters:
+        -----------------------------------
+        rows : BitRows
+            The names the implications are made of
+        implications : iterable
+            The implications to start with
+        """
+        self.rows = rows
+        self.bits = BitImplications()
+        self._implications = set()
+        # index in bits of each implication, and the other way round
+        self._indices = {}
+        self._by_index = {}
+        for implication in implications:
+            self.add(implication)
+
+    def _index(self, implication, masks=None):
+        if implication not in self._indices:
+            if masks is None:
+                masks = (self.rows.mask(implication[0]),
+                         self.rows.mask(implication[1]))
+            index = self._indices[implication] = self.bits.add(*masks)
+            self._by_index[index] = implication
+
+    def _unindex(self, implication):
+        index = self._indices.pop(implication, None)
+        if index is not None:
+            del self._by_index[index]
+            self.bits.discard(index)
+
+    def add(self, implication):
+        """
+        Adds an implication, given as a (premise, conclusion) tuple pair
+        """
+        self._index(implication)
+        self._implications.add(implication)
+
+    def discard(self, implication):
+        """
+        Removes an implication, if present
+        """
+        self._unindex(implication)
+        self._implications.discard(implication)
+
+    def restrict(self, implications, names):
+        """
+        Replaces the given implications A --> B by A --> BnC, C being the
+        given names
+        Parameters:
+        -----------------------------------
+        implications : set
+            The implications to be replaced
+        names : set
+            The names C to restrict their conclusions to
+        """
+        bits, mask = self.bits, self.rows.mask(names)
+        restricted = set()
+        masks = {}
+        # Rebuilt in the order of the set, as a new set of implications would be
+        for implication in self._implications:
+            if implication in implications:
+                index = self._indices[implication]
+                premise = bits.premises[index]
+                consequence = bits.consequences[index] & mask
+                self._unindex(implication)
+                implication = (implication[0],
+                               tuple(sorted(self.rows.names_of(consequence))))
+                masks[implication] = (premise, consequence)
+            restricted.add(implication)
+        for implication in restricted:
+            self._index(implication, masks.get(implication))
+        self._implications = restricted
+
+    def closure(self, names):
+        """
+        Gives the least superset of names respecting every implication
+        """
+        return(self.rows.names_of(self.bits.closure(self.rows.mask(names))))
+
+    def not_respecting(self, names):
+        """
+        Gives the set of implications the names don't respect, i.e whose
+        premise is within the names but not their conclusion
+        """
+        by_index = self._by_index
+        return(set(by_index[index]
+                   for index in self.bits.violated(self.rows.mask(names))))
+
+    def is_model(self, names):
+        """
+        Tells if the names respect every implication
+        """
+        for index in self.bits.violated(self.rows.mask(names)):
+            return(False)
+        return(True)
+
+    def premises_not_within(self, names):
+        """
+        Gives, in the order of the set, the implications A --> B whose premise
+        isn't within the names C, along with CnA
+        """
+        bits, indices, mask = self.bits, self._indices, self.rows.mask(names)
+        for implication in self._implications:
+            premise = bits.premises[indices[implication]]
+            if premise & ~mask:
+                yield(implication, self.rows.names_of(premise & mask))
+
+    def __contains__(self, implication):
+        return(implication in self._implications)
+
+    def __iter__(self):
+        return(iter(self._implications))
+
+    def __len__(self):
+        return(len(self._implications))
+
+    def __repr__(self):
+        return("Hypothesis({})".format(self._implications))
 
 
 class FCA(nx.Graph):
@@ -29,6 +415,18 @@ class FCA(nx.Graph):
     nqueries = 0
     pn_ratio = 0
     max_pn_ratio = 2
+    # Max number of closures kept around, the same sets being closed over and
+    # over by the oracles
+    closure_cache_size = 4096
+
+    def __init__(self, *args, **kwargs):
+        super(FCA, self).__init__(*args, **kwargs)
+        # The relation as bitmasks: the attributes of each object, and the
+        # objects of each attribute. Intents, extents and closures are
+        # computed on these rather than on the neighbours in the graph.
+        self.object_rows = BitRows()
+        self.attribute_rows = BitRows()
+        self.closures = LRUCache(self.closure_cache_size)
 
     def add_object(self, object_name):
         """
@@ -39,6 +437,7 @@ class FCA(nx.Graph):
             Name of the object to be added to the concept
         """
         self.add_node(object_name, type='object')
+        self.object_rows.add(object_name)
 
     def add_objects(self, object_names):
         """
@@ -59,6 +458,7 @@ class FCA(nx.Graph):
             Name of the attribute to be added to the concept
         """
         self.add_node(attribute_name, type='attribute')
+        self.attribute_rows.add(attribute_name)
 
     def add_attributes(self, attribute_names):
         """
@@ -85,6 +485,13 @@ class FCA(nx.Graph):
         self.add_object(object_name)
         self.add_attribute(attribute_name)
         self.add_edge(object_name, attribute_name)
+        object_index = self.object_rows.index[object_name]
+        attribute_index = self.attribute_rows.index[attribute_name]
+        if not self.object_rows.masks[object_index] >> attribute_index & 1:
+            self.object_rows.masks[object_index] |= 1 << attribute_index
+            self.attribute_rows.masks[attribute_index] |= 1 << object_index
+            # The closures computed so far may not hold anymore
+            self.closures.clear()
 
     def add_relations(self, relations):
         """
@@ -112,14 +519,9 @@ class FCA(nx.Graph):
         """
         if attribute_name is None:
             # Return all the objects in the lattice
-            objects = [
-                node for (
-                    node, data) in self.nodes(
-                    data=True) if data['type'] == 'object']
-        else:
-            objects = self[attribute_name]
+            return(self.object_rows.sorted_names())
 
-        objects = sorted(objects)
+        objects = sorted(self[attribute_name])
         return(objects)
 
     def attributes(self, object_name=None):
@@ -137,16 +539,49 @@ class FCA(nx.Graph):
         """
         if object_name is None:
             # Return all attributes in the concept
-            attributes = [
-                node for (
-                    node, data) in self.nodes(
-                    data=True) if data['type'] == 'attribute']
-        else:
-            attributes = self[object_name]
+            return(self.attribute_rows.sorted_names())
 
-        attributes = sorted(attributes)
+        attributes = sorted(self[object_name])
         return(attributes)
 
+    def shared_mask(self, names):
+        """
+        Intersects the bitmasks of the given objects (or attributes), giving
+        the ones of the other side related to all of them.
+        Parameters:
+        -----------------------------------
+        names : iterable
+            Non-empty collection of objects, or of attributes
+
+        Returns:
+        -----------------------------------
+        mask, rows : tuple
+            The bitmask of the shared names, and the BitRows it indexes
+
+        Raises:
+        -----------------------------------
+        KeyError : if a name is neither an object nor an attribute
+        """
+        for (own, other) in ((self.attribute_rows, self.object_rows),
+                             (self.object_rows, self.attribute_rows)):
+            index, masks = own.index, own.masks
+            mask = -1
+            try:
+                for name in names:
+                    mask &= masks[index[name]]
+            except KeyError:
+                continue
+            return((mask, other))
+
+        for name in names:
+            if name not in self.object_rows.index and \
+                    name not in self.attribute_rows.index:
+                raise KeyError(name)
+        # Objects and attributes share nothing
+        if next(iter(names)) in self.object_rows.index:
+            return((0, self.attribute_rows))
+        return((0, self.object_rows))
+
     def objects_intent(self, object_names):
         """
         Given a subset A of objects from G, calculates:
@@ -161,13 +596,10 @@ class FCA(nx.Graph):
         shared_attributes : set
             The set of attributes sharing the objects in object_names
         """
-        if len(object_names) is 0:
+        if len(object_names) == 0:
             return(self.attributes())
-        else:
-            attribute_sets = [set(self.attributes(object_name))
-                              for object_name in object_names]
-            shared_attributes = set.intersection(*attribute_sets)
-        return(shared_attributes)
+        mask, rows = self.shared_mask(object_names)
+        return(rows.names_of(mask))
 
     def attributes_extent(self, attribute_names):
         """
@@ -183,13 +615,186 @@ class FCA(nx.Graph):
         shared_objects : set
             The set of objects sharing the attributes in attribute_names
         """
-        if len(attribute_names) is 0:
+        if len(attribute_names) == 0:
             return(self.objects())
-        else:
-            object_sets = [set(self.objects(attribute_name))
-                           for attribute_name in attribute_names]
-            shared_objects = set.intersection(*object_sets)
-        return(shared_objects)
+        mask, rows = self.shared_mask(attribute_names)
+        return(rows.names_of(mask))
+
+    def close_shared(self, shared, rows):
+        """
+        Gives the bitmask of the names related to all the ones of a bitmask
+        Parameters:
+        -----------------------------------
+        shared : int
+            Bitmask of names of rows
+        rows : BitRows
+            object_rows or attribute_rows
+
+        Returns:
+        -----------------------------------
+        closure : int
+            The bitmask of the names of the other side, or None if shared is
+            empty
+        """
+        if shared == 0:
+            return(None)
+        masks = rows.masks
+        closure = -1
+        for index in bit_indices(shared):
+            closure &= masks[index]
+        return(closure)
+
+    def other_rows(self, rows):
+        """
+        Gives the other side of the relation than rows
+        """
+        if rows is self.object_rows:
+            return(self.attribute_rows)
+        return(self.object_rows)
+
+    def names_mask(self, names):
+        """
+        Gives the bitmask of a non-empty set of objects (or of attributes),
+        along with the bitmask of the names related to all of them
+        Parameters:
+        -----------------------------------
+        names : iterable
+            Non-empty collection of objects, or of attributes
+
+        Returns:
+        -----------------------------------
+        mask, shared, rows : tuple
+            The bitmask of names, the one of the shared names, and the
+            BitRows indexing names. rows is None if names mixes objects and
+            attributes.
+
+        Raises:
+        -----------------------------------
+        KeyError : if a name is neither an object nor an attribute
+        """
+        for rows in (self.attribute_rows, self.object_rows):
+            index, masks = rows.index, rows.masks
+            # As in BitRows.mask
+            digits = bytearray(b'0') * len(rows)
+            shared = -1
+            try:
+                for name in names:
+                    name_index = index[name]
+                    digits[-1 - name_index] = ord('1')
+                    shared &= masks[name_index]
+            except KeyError:
+                continue
+            return((int(digits, 2), shared, rows))
+
+        for name in names:
+            if name not in self.object_rows.index and \
+                    name not in self.attribute_rows.index:
+                raise KeyError(name)
+        return((0, 0, None))
+
+    def closure_mask(self, mask, rows, shared=None):
+        """
+        Closes a bitmask of objects (or of attributes): the names related to
+        all the ones related to all of mask. Closures are cached by bitmask
+        until the relation changes.
+        Parameters:
+        -----------------------------------
+        mask : int
+            Non-zero bitmask of names of rows
+        rows : BitRows
+            object_rows or attribute_rows
+        shared : int
+            The bitmask of the names related to all of mask, if known
+
+        Returns:
+        -----------------------------------
+        closure : int
+            The bitmask of the closure, or None if no name is related to all
+            of mask
+        """
+        key = (rows is self.object_rows, mask)
+        closure = self.closures.get(key, key)
+        if closure is key:
+            if shared is None:
+                masks = rows.masks
+                shared = -1
+                for index in bit_indices(mask):
+                    shared &= masks[index]
+            closure = self.close_shared(shared, self.other_rows(rows))
+            self.closures.put(key, closure)
+        return(closure)
+
+    def superset(self, names, everything):
+        """
+        Closes a non-empty set of objects (or of attributes) through the
+        bitmasks.
+        Parameters:
+        -----------------------------------
+        names : iterable
+            Non-empty collection of objects, or of attributes
+        everything : function
+            Gives the closure when no name is related to all of names
+
+        Returns:
+        -----------------------------------
+        closure : set
+            The closure of names
+        """
+        mask, shared, rows = self.names_mask(names)
+        # Objects and attributes share nothing
+        closure = None if rows is None else self.closure_mask(mask, rows, shared)
+        if closure is None:
+            return(everything())
+        return(rows.names_of(closure))
+
+    def side_closure(self, rows):
+        """
+        Gives the closure operator on the bitmasks of a side of the relation
+        Parameters:
+        -----------------------------------
+        rows : BitRows
+            object_rows or attribute_rows
+
+        Returns:
+        -----------------------------------
+        closure : function
+            From a bitmask of names of rows to the bitmask of its closure
+        """
+        other = self.other_rows(rows)
+        everything = (1 << len(rows)) - 1
+
+        def closure(mask):
+            if mask == 0:
+                # Shared by all the names of the other side
+                closed = self.close_shared((1 << len(other)) - 1, other)
+            else:
+                closed = self.closure_mask(mask, rows)
+            return(everything if closed is None else closed)
+        return(closure)
+
+    def concepts(self):
+        """
+        Enumerates the formal concepts (A, B) of the context, A being an
+        extent and B an intent (A' = B and B' = A), each exactly once.
+        NextClosure runs on the closed sets of the smaller side, in their
+        lectic order, and the other half of each concept is derived.
+
+        Returns:
+        -----------------------------------
+        concepts : generator
+            (extent, intent) tuples of sets
+        """
+        rows = min(self.object_rows, self.attribute_rows, key=len)
+        other = self.other_rows(rows)
+        masks = rows.masks
+        for closed in next_closure(self.side_closure(rows), len(rows)):
+            shared = (1 << len(other)) - 1
+            for index in bit_indices(closed):
+                shared &= masks[index]
+            if rows is self.object_rows:
+                yield((rows.names_of(closed), other.names_of(shared)))
+            else:
+                yield((other.names_of(shared), rows.names_of(closed)))
 
     def objects_superset(self, object_names):
         """
@@ -206,7 +811,9 @@ class FCA(nx.Graph):
         -----------------------------------
         closure of object_names
         """
-        return(self.attributes_extent(self.objects_intent(object_names)))
+        if len(object_names) == 0:
+            return(self.attributes_extent(self.objects_intent(object_names)))
+        return(self.superset(object_names, self.objects))
 
     def attributes_superset(self, attribute_names):
         """
@@ -223,7 +830,9 @@ class FCA(nx.Graph):
         -----------------------------------
         closure of attribute_names
         """
-        return(self.objects_intent(self.attributes_extent(attribute_names)))
+        if len(attribute_names) == 0:
+            return(self.objects_intent(self.attributes_extent(attribute_names)))
+        return(self.superset(attribute_names, self.attributes))
 
     def all_subsets(self, master_set):
         """
@@ -251,15 +860,13 @@ class FCA(nx.Graph):
     def set_of_intents(self):
         """
         Gives all matching attribute subsets such that B = B''.
-        """
-        all_attribute_subsets = self.all_subsets(self.attributes())
 
-        matching_attribute_subsets = set()
-        for attribute_subset in all_attribute_subsets:
-            if set(attribute_subset) == self.attributes_superset(
-                    attribute_subset):
-                matching_attribute_subsets.add(attribute_subset)
-        return(matching_attribute_subsets)
+        Returns:
+        -----------------------------------
+        intents : set
+            The intents of the context, as sorted tuples
+        """
+        return(set(tuple(sorted(intent)) for (_, intent) in self.concepts()))
 
     def relations(self):
         """
@@ -340,6 +947,8 @@ class FCA(nx.Graph):
         implications : list[tuple]
             Array of implications
         """
+        if isinstance(implications, Hypothesis):
+            return(implications.is_model(attribute_names))
         for (antecedent_attrs, consequent_attrs) in implications:
             if not self.is_model_of_implication(
                     attribute_names, antecedent_attrs, consequent_attrs):
@@ -369,19 +978,22 @@ class FCA(nx.Graph):
         if attribute_names is None:
             attribute_names = self.attributes()
 
-        all_attribute_subsets = self.all_subsets(
-            self.attributes())  # ! Should these be all attrs?
-        matching_attribute_subsets = set()
+        rows = self.attribute_rows
+        implications = [(rows.mask(antecedent_attrs), rows.mask(consequent_attrs))
+                        for (antecedent_attrs, consequent_attrs) in set_of_implications]
 
-        for attribute_subset in all_attribute_subsets:
-            is_closed = True
-        for (antecedent_attrs, consequent_attrs) in set_of_implications:
-            is_closed = is_closed and self.is_model_of_implication(
-                attribute_subset, antecedent_attrs, consequent_attrs)
+        def closure(mask):
+            # Applies the implications until the set respects all of them
+            closed = None
+            while closed != mask:
+                closed = mask
+                for (antecedent_mask, consequent_mask) in implications:
+                    if antecedent_mask & ~mask == 0:
+                        mask |= consequent_mask
+            return(mask)
 
-        if is_closed:
-            matching_attribute_subsets.add(attribute_subset)
-        return(matching_attribute_subsets)
+        return(set(tuple(sorted(rows.names_of(closed)))
+                   for closed in next_closure(closure, len(rows))))
 
     def valid_implication(self, antecedent_attrs, consequent_attrs):
         """
@@ -457,6 +1069,8 @@ class FCA(nx.Graph):
         disrespectful_implications : set
             Set of implications not respecting attribute_names
         """
+        if isinstance(implications, Hypothesis):
+            return(implications.not_respecting(attribute_names))
         disrespectful_implications = set()
         for (antecedent_attrs, consequent_attrs) in implications:
             if not self.is_model_of_implication(
@@ -483,6 +1097,9 @@ class FCA(nx.Graph):
         final_implications : set
             Updated set of implications
         """
+        if isinstance(implications, Hypothesis):
+            implications.restrict(disrespectful_implications, attribute_names)
+            return(implications)
         final_implications = set()
         for implication in implications:
             if implication in disrespectful_implications:
@@ -508,6 +1125,12 @@ class FCA(nx.Graph):
         is_member : function
             Membership oracle
         """
+        if isinstance(implications, Hypothesis):
+            for (implication, shared_attrs) in implications.premises_not_within(
+                    attribute_names):
+                if not is_member(implications, shared_attrs, self.attributes_superset):
+                    return(implication)
+            return
         for (antecedent_attrs, consequent_attrs) in implications:
             antecedent_attrs = set(antecedent_attrs)
             consequent_attrs = set(consequent_attrs)
@@ -558,7 +1181,7 @@ class FCA(nx.Graph):
         H : set
             The computed set of implications for the given concept lattice
         """
-        H = set()
+        H = Hypothesis(self.attribute_rows)
 
         C, self.nqueries, self.pn_ratio = is_equivalent(H, self.nqueries,
                                                         oracle.li_times,
@@ -569,7 +1192,7 @@ class FCA(nx.Graph):
             # belong to C or B belongs to C)
             disrespectful_implications = self.implications_not_respecting_attributes(
                 C, H)
-            if len(disrespectful_implications) is not 0:
+            if len(disrespectful_implications) != 0:
                 verbose_print_3("Present in Block-1 of Horn1")
                 # replace all such implications A->B by A->BnC
                 H = self.replace_disrespectful_implications(
@@ -643,21 +1266,53 @@ class FCA(nx.Graph):
         """
         return(self.horn1(is_member, oracle.is_approx_equivalent(is_member, self.attributes(), self.nqueries, self.attributes_extent, self.attributes_superset, self.is_model_of_implications, self.pn_ratio, self.max_pn_ratio, epsilon, delta)))
 
-    def enumerateConcepts(self):
-        concepts = {}
-        objects = self.objects()
-        objects_powerset = []
+    def canonical_basis(self):
+        """
+        Computes the Duquenne-Guigues (canonical) basis: the implications
+        P -> P'' of the pseudo-intents P, the least set of implications the
+        intents are the models of. NextClosure enumerates the sets closed
+        under the implications found so far (applied with LinClosure), which
+        are the intents and the pseudo-intents, in lectic order.
 
-        for i in range(len(objects)):
-            objects_powerset += list(itertools.combinations(objects, i + 1))
+        Returns:
+        -----------------------------------
+        basis : set
+            The implications as (tuple(sorted(premise)),
+            tuple(sorted(closure))), as in pac_basis
+        """
+        rows = self.attribute_rows
+        context_closure = self.side_closure(rows)
+        implications = BitImplications()
+        basis = set()
+
+        def closure(mask):
+            return(implications.closure(mask, proper=True))
+
+        for closed in next_closure(closure, len(rows)):
+            intent = context_closure(closed)
+            if intent != closed:
+                implications.add(closed, intent)
+                basis.add((tuple(sorted(rows.names_of(closed))),
+                           tuple(sorted(rows.names_of(intent)))))
+        return(basis)
+
+    def enumerateConcepts(self):
+        """
+        Gives the formal concepts with a non-empty extent and intent, in the
+        order of FCA.concepts.
 
+        Returns:
+        -----------------------------------
+        concepts : dict
+            {"intent": set, "extent": sorted tuple} of each concept, by id
+        """
+        concepts = {}
         c_id = 0
-        for object_group in objects_powerset:
-            intent = self.objects_intent(object_group)
-            if len(intent) == 0:
+        for (extent, intent) in self.concepts():
+            if len(extent) == 0 or len(intent) == 0:
                 continue
             concepts[c_id] = {"intent": intent,
-                              "extent": object_group}
+                              "extent": tuple(sorted(extent))}
             c_id += 1
         return concepts
 
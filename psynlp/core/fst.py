@@ -7,16 +7,172 @@ For theory, refer:
     - http://pagesperso.lina.univ-nantes.fr/~cdlh//book/Learning_transducers.pdf
 """
 
-import networkx as nx
+import sys
+import mmap
+import json
+import struct
+from array import array
+from ..helpers.cache import LRUCache
+from ..helpers.trie import WordTrie
 
+# Marks the absence of a slot / arc in the adjacency arrays
+NIL = -1
 
-class FST(nx.DiGraph):
+# Leading bytes of a saved FST file, the last one being the format version
+MAGIC = b'PSYFST\x00\x03'
+
+# Array columns of an FST, as written to / memory-mapped from a saved file
+COLUMNS = [('_slot_of', 'i'), ('_state_ids', 'q'), ('_alive', 'B'),
+           ('_out_head', 'i'), ('_out_tail', 'i'), ('_in_head', 'i'),
+           ('_in_tail', 'i'), ('_out_degree', 'i'), ('_in_degree', 'i'),
+           ('_live_prev', 'i'), ('_live_next', 'i'), ('_touched', 'B'),
+           ('_arc_from', 'i'), ('_arc_to', 'i'), ('_arc_input', 'i'),
+           ('_arc_output', 'i'), ('_arc_next_out', 'i'),
+           ('_arc_next_in', 'i'), ('_arc_alive', 'B')]
+
+
+class SymbolTable(object):
+    """
+    Interns symbols (input-output chunks, metadata tags) into consecutive
+    integer ids, so that each distinct string is stored only once per
+    transducer.
+    """
+
+    def __init__(self, symbols=()):
+        self._ids = {}
+        self._symbols = []
+        for symbol in symbols:
+            self.intern(symbol)
+
+    def intern(self, symbol):
+        """
+        Returns the id of a symbol, adding it to the table if required.
+        Parameters:
+        -----------------------------------
+        symbol : str
+            The symbol to be interned
+
+        Returns:
+        -----------------------------------
+        symbol_id : int
+            Id of the interned symbol
+        """
+        symbol_id = self._ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self._symbols)
+            self._ids[symbol] = symbol_id
+            self._symbols.append(symbol)
+        return(symbol_id)
+
+    def id(self, symbol):
+        """
+        Returns the id of an already interned symbol, or None
+        """
+        return(self._ids.get(symbol))
+
+    def symbol(self, symbol_id):
+        """
+        Returns the symbol corresponding to an id
+        """
+        return(self._symbols[symbol_id])
+
+    def symbols(self):
+        """
+        Returns all the interned symbols, ordered by their ids
+        """
+        return(list(self._symbols))
+
+    def __len__(self):
+        return(len(self._symbols))
+
+    def __contains__(self, symbol):
+        return(symbol in self._ids)
+
+
+class FST(object):
     """
     An FST has two important properties attached to it,
 
     - State, to represent a node
     - Edges, that contain the input-output transitions
+
+    States are integer ids mapped to consecutive slots, arcs are rows in flat
+    arrays (linked per slot, in insertion order) and every input, output and
+    metadata string is interned in a SymbolTable. The live states are also
+    chained in a doubly linked list, so the first, last and next states are
+    found in constant time.
+
+    Every metadata tag is also indexed as a bitset over slots, so contextual
+    subgraphs are computed with bitwise ANDs and cached per tag bundle.
+
+    An FST can be saved to a binary file and loaded back with its columns
+    memory-mapped (read-only, shared between processes); they are copied into
+    regular arrays only if the loaded FST is mutated.
     """
+
+    # Max number of tag bundles whose contextual subgraphs are kept around
+    context_cache_size = 256
+
+    def __init__(self):
+        self.symbols = SymbolTable()
+        self.tags = SymbolTable()
+
+        # state id -> slot (dense ids in an array, the rest in a dict), and
+        # the per-slot columns
+        self._slot_of = array('i', [NIL])
+        self._sparse_slots = {}
+        self._state_ids = array('q')
+        self._alive = bytearray()
+        self._out_head = array('i')
+        self._out_tail = array('i')
+        self._in_head = array('i')
+        self._in_tail = array('i')
+        self._out_degree = array('i')
+        self._in_degree = array('i')
+        # doubly linked list of the live slots, in the order they were added
+        self._live_prev = array('i')
+        self._live_next = array('i')
+        self._live_head = NIL
+        self._live_tail = NIL
+        # flags the slots whose outgoing arcs were added / relabelled since
+        # they were last untouched
+        self._touched = bytearray()
+        # running state counter, and the cached tuple of live states
+        self._next_state = 1
+        self._states = None
+
+        # per-arc columns
+        self._arc_from = array('i')
+        self._arc_to = array('i')
+        self._arc_input = array('i')
+        self._arc_output = array('i')
+        self._arc_next_out = array('i')
+        self._arc_next_in = array('i')
+        self._arc_alive = bytearray()
+
+        # metadata tag id -> slots of the states it is attached to, and the
+        # other way round (slot -> set of tag ids, built when first needed)
+        self._tag_slots = []
+        self._slot_tags = None
+
+        # bumped on every mutation, to invalidate the bitsets and the views
+        self._version = 0
+        self._indexed_version = None
+        self._alive_bits = 0
+        self._tag_bits = []
+        self._contexts = LRUCache(self.context_cache_size)
+
+        # mmap backing the columns of a loaded FST, and its saved info
+        self._buffer = None
+        self.info = {}
+
+        self._compiled = None
+        self._path_indexes = {}
+        self._path_indexes_version = None
+
+        # inverse operations of the mutations since begin(), or None
+        self._journal = None
+
     def add_state(self, newest_state=None):
         """
         Adds a new state, depending on the max added state.
@@ -32,31 +188,105 @@ class FST(nx.DiGraph):
         """
         if newest_state is None:
             newest_state = self.new_state()
-        self.add_node(newest_state, type='state')
+        if self._slot(newest_state) is None:
+            self._thaw()
+            self._log(('add_state', newest_state, self._next_state))
+            self._set_slot(newest_state, len(self._state_ids))
+            self._states = None
+            self._version += 1
+            if newest_state >= self._next_state:
+                self._next_state = newest_state + 1
+            self._state_ids.append(newest_state)
+            self._alive.append(1)
+            for column in (self._out_head, self._out_tail,
+                           self._in_head, self._in_tail):
+                column.append(NIL)
+            self._out_degree.append(0)
+            self._in_degree.append(0)
+            self._touched.append(0)
+            self._link_live(len(self._state_ids) - 1)
         return(newest_state)
 
     def new_state(self):
         """
-        Returns possible new state in Transducer network
+        Returns possible new state in Transducer network, i.e one more than
+        the max state ever added (or 1 for an empty Transducer)
         """
-        states = self.states()
-        if states:
-            return max(states) + 1
-        else:
-            return 1
+        return(self._next_state)
+
+    def has_state(self, state):
+        """
+        Tells if the given state is present in the Transducer
+        """
+        return(self._slot(state) is not None)
 
     def states(self):
         """
-        Gives all the states states present in the Transducer.
+        Gives all the states states present in the Transducer, in the order
+        they were added. The tuple is cached until the next state is added or
+        removed.
         Returns:
         -----------------------------------
-        states : list[int]
+        states : tuple[int]
             Arrary of state-ids in the transducer
         """
+        if self._states is None:
+            alive = self._alive
+            self._states = tuple(state for (slot, state)
+                                 in enumerate(self._state_ids) if alive[slot])
+        return(self._states)
+
+    def remove_state(self, state):
+        """
+        Removes a state along with all its arcs and metadata links.
+        Parameters:
+        -----------------------------------
+        state : int
+            Id of the state to be removed
+        """
+        self._thaw()
+        slot = self._slot(state)
+        self._log(('remove_state', state, slot,
+                   self._live_prev[slot], self._live_next[slot]))
+        self._set_slot(state, NIL)
+        self._states = None
+        self._version += 1
+        self._alive[slot] = 0
+        self._unlink_live(slot)
+        for arc in self._out_arc_ids(slot):
+            self._kill_arc(arc)
+        for arc in self._in_arc_ids(slot):
+            self._kill_arc(arc)
 
-        states = [node for (node, data) in self.nodes(
-            data=True) if 'type' in data and data['type'] == 'state']
-        return(states)
+    def first_state(self):
+        """
+        Gives the earliest added state that is still present, or None if the
+        Transducer has no states
+        """
+        return(self._live_state(self._live_head))
+
+    def last_state(self):
+        """
+        Gives the latest added state that is still present, or None if the
+        Transducer has no states
+        """
+        return(self._live_state(self._live_tail))
+
+    def next_state(self, state):
+        """
+        Gives the state added right after the given one, among the states
+        still present.
+        Parameters:
+        -----------------------------------
+        state : int
+            Id of a state present in the Transducer
+
+        Returns:
+        -----------------------------------
+        next_state : int
+            Id of the next state, or None if state is the last one
+        """
+        return(self._live_state(self._live_next[self._slot(state)]))
 
     def add_metadata(self, metadata):
         """
@@ -66,15 +296,44 @@ class FST(nx.DiGraph):
         metadata : str
             The metadata to add to the transducer
         """
-        self.add_node(metadata, type='metadata')
+        tag = self.tags.intern(metadata)
+        if tag == len(self._tag_slots):
+            self._tag_slots.append(array('i'))
+        return(tag)
 
     def metadatas(self):
         """
         Returns all metadata nodes present in the Transducer
         """
-        metadatas = [node for (node, data) in self.nodes(
-            data=True) if 'type' in data and data['type'] == 'metadata']
-        return(metadatas)
+        return(self.tags.symbols())
+
+    def link_metadata(self, metadata, state):
+        """
+        Attaches a metadata to a state, i.e the state is valid in the context
+        of that metadata.
+        Parameters:
+        -----------------------------------
+        metadata : str
+            The metadata to be attached
+        state : int
+            Id of the state
+        """
+        slot = self._slot(state)
+        tag = self.add_metadata(metadata)
+        tags = self._index_slot_tags().setdefault(slot, set())
+        if tag not in tags:
+            self._thaw()
+            self._log(('link_metadata', tag))
+            self._tag_slots[tag].append(slot)
+            tags.add(tag)
+            self._version += 1
+
+    def state_metadatas(self, state):
+        """
+        Returns all the metadatas attached to a state
+        """
+        tags = self._index_slot_tags().get(self._slot(state), ())
+        return([self.tags.symbol(tag) for tag in sorted(tags)])
 
     def contextual_subgraph(self, metadatas=[]):
         """
@@ -85,18 +344,21 @@ class FST(nx.DiGraph):
             A list of metadatas for context
         Returns:
         -----------------------------------
-        contextual_subgraph : nx.Graph
+        contextual_subgraph : FSTView
             Transducer network corresponding to given metadatas
         """
+        self._index_tags()
+        tags = frozenset(tag for tag in map(self.tags.id, metadatas)
+                         if tag is not None)
 
-        contextual_states = set(self.states())
-        for metadata in metadatas:
-            try:
-                contextual_states = contextual_states.intersection(set(self[metadata]))
-            except KeyError:
-                contextual_states = contextual_states
-
-        contextual_subgraph = self.subgraph(list(contextual_states))
+        contextual_subgraph = self._contexts.get(tags)
+        if contextual_subgraph is None:
+            contextual_bits = self._alive_bits
+            for tag in tags:
+                contextual_bits &= self._tag_bits[tag]
+            contextual_subgraph = FSTView(
+                self, SlotBitset(contextual_bits, len(self._alive)))
+            self._contexts.put(tags, contextual_subgraph)
         return(contextual_subgraph)
 
     def add_arc(self, from_state, input, output, to_state):
@@ -113,7 +375,138 @@ class FST(nx.DiGraph):
         to_state: int
             The output state of an arc
         """
-        self.add_edge(from_state, to_state, input=input, output=output)
+        self._thaw()
+        from_slot = self._slot(self.add_state(from_state))
+        to_slot = self._slot(self.add_state(to_state))
+
+        input, output = self.symbols.intern(input), self.symbols.intern(output)
+        arc = self._find_arc(from_slot, to_slot)
+        if arc != NIL:
+            self._log(('set_labels', arc,
+                       self._arc_input[arc], self._arc_output[arc]))
+            self._arc_input[arc] = input
+            self._arc_output[arc] = output
+            self._touched[from_slot] = 1
+            self._version += 1
+            return
+
+        arc = len(self._arc_from)
+        self._log(('add_arc', self._out_tail[from_slot], self._in_tail[to_slot]))
+        self._version += 1
+        self._arc_from.append(from_slot)
+        self._arc_to.append(to_slot)
+        self._arc_input.append(input)
+        self._arc_output.append(output)
+        self._arc_next_out.append(NIL)
+        self._arc_next_in.append(NIL)
+        self._arc_alive.append(1)
+
+        if self._out_tail[from_slot] == NIL:
+            self._out_head[from_slot] = arc
+        else:
+            self._arc_next_out[self._out_tail[from_slot]] = arc
+        self._out_tail[from_slot] = arc
+        self._out_degree[from_slot] += 1
+        self._touched[from_slot] = 1
+
+        if self._in_tail[to_slot] == NIL:
+            self._in_head[to_slot] = arc
+        else:
+            self._arc_next_in[self._in_tail[to_slot]] = arc
+        self._in_tail[to_slot] = arc
+        self._in_degree[to_slot] += 1
+
+    def arc(self, from_state, to_state):
+        """
+        Gives the input-output labels of the arc between two states
+        Parameters:
+        -----------------------------------
+        from_state : int
+            The input state of an arc
+        to_state: int
+            The output state of an arc
+
+        Returns:
+        -----------------------------------
+        labels : tuple
+            (input, output) of the arc, or None if there is no such arc
+        """
+        arc = self._find_arc(self._slot(from_state), self._slot(to_state))
+        if arc == NIL:
+            return(None)
+        return((self.symbols.symbol(self._arc_input[arc]),
+                self.symbols.symbol(self._arc_output[arc])))
+
+    def set_output(self, from_state, to_state, output):
+        """
+        Updates the output of the arc between two states
+        """
+        self._thaw()
+        arc = self._find_arc(self._slot(from_state), self._slot(to_state))
+        self._log(('set_labels', arc,
+                   self._arc_input[arc], self._arc_output[arc]))
+        self._arc_output[arc] = self.symbols.intern(output)
+        self._touched[self._arc_from[arc]] = 1
+        self._version += 1
+
+    def out_arcs(self, state):
+        """
+        Gives the outgoing arcs of a state
+        Returns:
+        -----------------------------------
+        arcs : list[tuple]
+            A list of (to_state, input, output) tuples
+        """
+        return(self._labelled_arcs(self._out_arc_ids(self._slot(state)),
+                                   self._arc_to))
+
+    def out_arcs_by_input(self, state):
+        """
+        Indexes the outgoing arcs of a state by their input
+        Returns:
+        -----------------------------------
+        arcs : dict
+            Maps each input to a list of (to_state, output) tuples, in the
+            order the arcs were added
+        """
+        arcs = {}
+        for (to_state, input, output) in self.out_arcs(state):
+            arcs.setdefault(input, []).append((to_state, output))
+        return(arcs)
+
+    def touched_states(self):
+        """
+        Gives the states whose outgoing arcs were added or relabelled (also by
+        a rollback) since they were last untouched, in the order they were
+        added. All the states with arcs are touched in a new Transducer.
+        """
+        touched, alive, state_ids = self._touched, self._alive, self._state_ids
+        if not isinstance(touched, bytearray):
+            # memory-mapped by load, which can't be searched
+            touched = bytes(touched)
+        slot = touched.find(1)
+        while slot != -1:
+            if alive[slot]:
+                yield state_ids[slot]
+            slot = touched.find(1, slot + 1)
+
+    def untouch(self, state):
+        """
+        Marks the outgoing arcs of a state as checked
+        """
+        self._thaw()
+        self._touched[self._slot(state)] = 0
+
+    def in_arcs(self, state):
+        """
+        Gives the incoming arcs of a state
+        Returns:
+        -----------------------------------
+        arcs : list[tuple]
+            A list of (from_state, input, output) tuples
+        """
+        return(self._labelled_arcs(self._in_arc_ids(self._slot(state)),
+                                   self._arc_from))
 
     def arcs(self):
         """
@@ -123,10 +516,687 @@ class FST(nx.DiGraph):
         edges : list
             A list of edges (arcs) that are present in the Transducer network
         """
-        edges = []
-        states = self.states()
-        for edge in self.edges:
-            node_1, node_2 = edge
-            if node_1 in states and node_2 in states:
-                edges.append(edge)
-        return edges
+        state_ids = self._state_ids
+        return([(state_ids[self._arc_from[arc]], state_ids[self._arc_to[arc]])
+                for arc in range(len(self._arc_from)) if self._arc_alive[arc]])
+
+    def begin(self):
+        """
+        Starts logging the inverse of every mutation, unless already started,
+        so that they can be undone with rollback.
+
+        Returns:
+        -----------------------------------
+        savepoint : int
+            Marker of the current state of the Transducer, to roll back to
+        """
+        if self._journal is None:
+            self._journal = []
+        return(len(self._journal))
+
+    def rollback(self, savepoint=0):
+        """
+        Undoes the mutations made since the savepoint, latest first, in time
+        proportional to their number. Interned symbols and metadata names are
+        kept. Nothing is undone if no mutations are being logged, i.e begin
+        was never called or they were committed since.
+        Parameters:
+        -----------------------------------
+        savepoint : int
+            A savepoint returned by begin
+        """
+        journal = self._journal
+        if journal is None:
+            return
+        while len(journal) > savepoint:
+            entry = journal.pop()
+            getattr(self, '_undo_' + entry[0])(*entry[1:])
+        self._states = None
+        self._version += 1
+
+    def commit(self):
+        """
+        Keeps the mutations made since begin, and stops logging them
+        """
+        self._journal = None
+
+    def paths(self, source=0, target=-1):
+        """
+        Generates all the simple paths from source to target, in a depth-first
+        manner following the order in which arcs were added.
+        Parameters:
+        -----------------------------------
+        source : int
+            State to start the paths from
+        target : int
+            State to end the paths at
+
+        Returns:
+        -----------------------------------
+        paths : generator
+            Generator of paths, each being a list of state-ids
+        """
+        return(self._paths(source, target, None))
+
+    def path_index(self, source=0, target=-1):
+        """
+        Gives the input words and the arcs of all the simple paths from source
+        to target, in the order of paths(). The index is cached until the
+        Transducer changes.
+
+        Returns:
+        -----------------------------------
+        index : PathIndex
+            The words and arcs of the paths
+        """
+        if self._path_indexes_version != self._version:
+            self._path_indexes = {}
+            self._path_indexes_version = self._version
+        index = self._path_indexes.get((source, target))
+        if index is None:
+            index = PathIndex(self, self._path_arcs(source, target, None))
+            self._path_indexes[(source, target)] = index
+        return(index)
+
+    def _paths(self, source, target, within):
+        arc_to, state_ids = self._arc_to, self._state_ids
+        for arcs in self._path_arcs(source, target, within):
+            yield [source] + [state_ids[arc_to[arc]] for arc in arcs]
+
+    def _path_arcs(self, source, target, within):
+        # Depth-first search of the simple paths, each given as its arc-ids
+        source, target = self._slot(source), self._slot(target)
+        if source is None or target is None:
+            return
+        if within is not None and (source not in within or target not in within):
+            return
+
+        arc_to = self._arc_to
+        arcs = []
+        on_path = {source}
+        stack = [self._successor_arcs(source, within)]
+        while stack:
+            arc = next(stack[-1], None)
+            if arc is None:
+                stack.pop()
+                if arcs:
+                    on_path.discard(arc_to[arcs.pop()])
+            elif arc_to[arc] == target:
+                yield arcs + [arc]
+            elif arc_to[arc] not in on_path:
+                arcs.append(arc)
+                on_path.add(arc_to[arc])
+                stack.append(self._successor_arcs(arc_to[arc], within))
+
+    def compile(self):
+        """
+        Gives the deterministic transition table of the Transducer, cached
+        until the Transducer changes.
+        Returns:
+        -----------------------------------
+        compiled : CompiledFST
+            Table to transduce words in a single left-to-right pass
+        """
+        if self._compiled is None or self._compiled.version != self._version:
+            self._compiled = CompiledFST(self)
+        return(self._compiled)
+
+    def save(self, path, info=None):
+        """
+        Saves the FST to a binary file: a magic string, a JSON header (symbol
+        tables, column layout and info) and then the raw array columns, each
+        aligned to 8 bytes so that they can be memory-mapped back.
+        Parameters:
+        -----------------------------------
+        path : str
+            Path of the file to write
+        info : dict
+            JSON-serializable details to be saved along with the FST
+        """
+        tag_offsets, tag_slots = array('q', [0]), array('i')
+        for slots in self._tag_slots:
+            tag_slots.extend(slots)
+            tag_offsets.append(len(tag_slots))
+
+        columns = [(name, typecode, getattr(self, name))
+                   for (name, typecode) in COLUMNS]
+        columns += [('_tag_offsets', 'q', tag_offsets),
+                    ('_tag_slots', 'i', tag_slots)]
+
+        layout, blobs, offset = {}, [], 0
+        for (name, typecode, column) in columns:
+            blob = bytes(column)
+            layout[name] = [typecode, offset, len(column)]
+            blobs.append(blob + bytes(_padding(len(blob))))
+            offset += len(blobs[-1])
+
+        header = json.dumps({
+            'byteorder': sys.byteorder,
+            'next_state': self._next_state,
+            'live_ends': [self._live_head, self._live_tail],
+            'sparse_slots': sorted(self._sparse_slots.items()),
+            'symbols': self.symbols.symbols(),
+            'tags': self.tags.symbols(),
+            'columns': layout,
+            'info': info or {}}).encode('utf-8')
+
+        with open(path, 'wb') as file:
+            file.write(MAGIC + struct.pack('<I', len(header)) + header)
+            file.write(bytes(_padding(len(MAGIC) + 4 + len(header))))
+            for blob in blobs:
+                file.write(blob)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads an FST saved with FST.save, memory-mapping its columns.
+        Parameters:
+        -----------------------------------
+        path : str
+            Path of the file to read
+
+        Returns:
+        -----------------------------------
+        fst : FST
+            The loaded FST, with the saved info in fst.info
+        """
+        with open(path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError("{} is not a saved FST".format(path))
+        (length,) = struct.unpack_from('<I', buffer, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(buffer[start:start + length].decode('utf-8'))
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError("{} was saved with a different byteorder".format(path))
+        start += length + _padding(start + length)
+
+        fst = cls()
+        view = memoryview(buffer)
+        for (name, (typecode, offset, count)) in header['columns'].items():
+            size = count * array(typecode).itemsize
+            column = view[start + offset:start + offset + size].cast(typecode)
+            setattr(fst, name, column)
+
+        tag_offsets, tag_slots = fst._tag_offsets, fst._tag_slots
+        fst._tag_slots = [tag_slots[tag_offsets[tag]:tag_offsets[tag + 1]]
+                          for tag in range(len(tag_offsets) - 1)]
+        del fst._tag_offsets
+
+        fst.symbols = SymbolTable(header['symbols'])
+        fst.tags = SymbolTable(header['tags'])
+        fst._sparse_slots = dict(header['sparse_slots'])
+        fst._next_state = header['next_state']
+        fst._live_head, fst._live_tail = header['live_ends']
+        fst.info = header['info']
+        fst._buffer = buffer
+        return(fst)
+
+    def _thaw(self):
+        # Copies memory-mapped columns into regular arrays, before a mutation
+        if self._buffer is None:
+            return
+        for (name, typecode) in COLUMNS:
+            column = getattr(self, name)
+            if typecode == 'B':
+                setattr(self, name, bytearray(column))
+            else:
+                setattr(self, name, array(typecode, column.tobytes()))
+        self._tag_slots = [array('i', slots.tobytes())
+                           for slots in self._tag_slots]
+        self._buffer = None
+
+    def _index_tags(self):
+        # (Re)builds the slot bitsets of every tag, if the FST has changed
+        if self._indexed_version == self._version:
+            return
+        alive, size = self._alive, len(self._alive)
+        self._alive_bits = SlotBitset.pack(
+            (slot for slot in range(size) if alive[slot]), size)
+        self._tag_bits = [SlotBitset.pack(slots, size)
+                          for slots in self._tag_slots]
+        self._contexts.clear()
+        self._indexed_version = self._version
+
+    def _index_slot_tags(self):
+        # Gives the tags of each slot, indexed from the slots of each tag the
+        # first time they are asked for and then kept up to date
+        if self._slot_tags is None:
+            self._slot_tags = {}
+            for (tag, slots) in enumerate(self._tag_slots):
+                for slot in slots:
+                    self._slot_tags.setdefault(slot, set()).add(tag)
+        return(self._slot_tags)
+
+    def _log(self, entry):
+        # Records the inverse of a mutation, inside a transaction
+        if self._journal is not None:
+            self._journal.append(entry)
+
+    def _undo_add_state(self, state, next_state):
+        # The state is the latest slot, as the later ones are undone first
+        slot = len(self._state_ids) - 1
+        self._unlink_live(slot)
+        self._set_slot(state, NIL)
+        self._next_state = next_state
+        for column in (self._state_ids, self._alive, self._out_head,
+                       self._out_tail, self._in_head, self._in_tail,
+                       self._out_degree, self._in_degree,
+                       self._live_prev, self._live_next, self._touched):
+            column.pop()
+
+    def _undo_remove_state(self, state, slot, prev, next):
+        self._set_slot(state, slot)
+        self._alive[slot] = 1
+        self._live_prev[slot], self._live_next[slot] = prev, next
+        if prev == NIL:
+            self._live_head = slot
+        else:
+            self._live_next[prev] = slot
+        if next == NIL:
+            self._live_tail = slot
+        else:
+            self._live_prev[next] = slot
+
+    def _undo_link_metadata(self, tag):
+        slot = self._tag_slots[tag].pop()
+        if self._slot_tags is not None:
+            self._slot_tags[slot].discard(tag)
+
+    def _undo_add_arc(self, out_tail, in_tail):
+        # The arc is the latest one, hence the tail of both its lists
+        from_slot, to_slot = self._arc_from.pop(), self._arc_to.pop()
+        if out_tail == NIL:
+            self._out_head[from_slot] = NIL
+        else:
+            self._arc_next_out[out_tail] = NIL
+        self._out_tail[from_slot] = out_tail
+        if in_tail == NIL:
+            self._in_head[to_slot] = NIL
+        else:
+            self._arc_next_in[in_tail] = NIL
+        self._in_tail[to_slot] = in_tail
+        self._out_degree[from_slot] -= 1
+        self._in_degree[to_slot] -= 1
+        for column in (self._arc_input, self._arc_output, self._arc_next_out,
+                       self._arc_next_in, self._arc_alive):
+            column.pop()
+
+    def _undo_set_labels(self, arc, input, output):
+        self._arc_input[arc] = input
+        self._arc_output[arc] = output
+        self._touched[self._arc_from[arc]] = 1
+
+    def _undo_kill_arc(self, arc):
+        self._arc_alive[arc] = 1
+        self._touched[self._arc_from[arc]] = 1
+        self._out_degree[self._arc_from[arc]] += 1
+        self._in_degree[self._arc_to[arc]] += 1
+
+    def _link_live(self, slot):
+        # Appends a slot at the tail of the live list
+        self._live_prev.append(self._live_tail)
+        self._live_next.append(NIL)
+        if self._live_tail == NIL:
+            self._live_head = slot
+        else:
+            self._live_next[self._live_tail] = slot
+        self._live_tail = slot
+
+    def _unlink_live(self, slot):
+        # Takes a slot out of the live list, in O(1)
+        prev, next = self._live_prev[slot], self._live_next[slot]
+        if prev == NIL:
+            self._live_head = next
+        else:
+            self._live_next[prev] = next
+        if next == NIL:
+            self._live_tail = prev
+        else:
+            self._live_prev[next] = prev
+        self._live_prev[slot] = self._live_next[slot] = NIL
+
+    def _live_state(self, slot):
+        return(None if slot == NIL else self._state_ids[slot])
+
+    def _slot(self, state):
+        if 0 <= state < len(self._slot_of):
+            slot = self._slot_of[state]
+            return(None if slot == NIL else slot)
+        return(self._sparse_slots.get(state))
+
+    def _set_slot(self, state, slot):
+        slot_of = self._slot_of
+        if 0 <= state < len(slot_of):
+            slot_of[state] = slot
+        elif slot == NIL:
+            del self._sparse_slots[state]
+        elif state == len(slot_of):
+            slot_of.append(slot)
+            # Adopt sparse ids that have now become dense
+            while len(slot_of) in self._sparse_slots:
+                slot_of.append(self._sparse_slots.pop(len(slot_of)))
+        else:
+            self._sparse_slots[state] = slot
+
+    def _successor_arcs(self, slot, within):
+        arc_to = self._arc_to
+        for arc in self._out_arc_ids(slot):
+            if within is None or arc_to[arc] in within:
+                yield arc
+
+    def _out_arc_ids(self, slot):
+        arcs = []
+        arc = self._out_head[slot]
+        while arc != NIL:
+            if self._arc_alive[arc]:
+                arcs.append(arc)
+            arc = self._arc_next_out[arc]
+        return(arcs)
+
+    def _in_arc_ids(self, slot):
+        arcs = []
+        arc = self._in_head[slot]
+        while arc != NIL:
+            if self._arc_alive[arc]:
+                arcs.append(arc)
+            arc = self._arc_next_in[arc]
+        return(arcs)
+
+    def _find_arc(self, from_slot, to_slot):
+        # Walk whichever of the two adjacency lists is shorter
+        if self._out_degree[from_slot] <= self._in_degree[to_slot]:
+            arc, next_arc, other, end = (self._out_head[from_slot],
+                                         self._arc_next_out, self._arc_to,
+                                         to_slot)
+        else:
+            arc, next_arc, other, end = (self._in_head[to_slot],
+                                         self._arc_next_in, self._arc_from,
+                                         from_slot)
+        while arc != NIL:
+            if self._arc_alive[arc] and other[arc] == end:
+                return(arc)
+            arc = next_arc[arc]
+        return(NIL)
+
+    def _kill_arc(self, arc):
+        if self._arc_alive[arc]:
+            self._log(('kill_arc', arc))
+            self._arc_alive[arc] = 0
+            self._out_degree[self._arc_from[arc]] -= 1
+            self._in_degree[self._arc_to[arc]] -= 1
+
+    def _labelled_arcs(self, arcs, endpoint):
+        symbol, state_ids = self.symbols.symbol, self._state_ids
+        return([(state_ids[endpoint[arc]], symbol(self._arc_input[arc]),
+                 symbol(self._arc_output[arc])) for arc in arcs])
+
+
+class CompiledFST(object):
+    """
+    Deterministic transition table of an FST (or of a view of it). Each state
+    gets a row mapping an input symbol to (output, next state), built lazily
+    the first time the state is visited. Symbols with more than one arc out of
+    a state are marked as ambiguous, and treated like missing transitions.
+    """
+
+    AMBIGUOUS = object()
+
+    def __init__(self, fst, within=None):
+        self.fst = fst
+        self.version = fst._version
+        self._within = within
+        self._rows = {}
+
+    def transduce(self, word, source=0, target=-1, end_marker=None):
+        """
+        Transduces a word from source to target, in time linear in its length.
+        An arc with an empty input is followed only when the state has no arc
+        for the next symbol (a state having both is ambiguous).
+        Parameters:
+        -----------------------------------
+        word : str
+            The input word, consumed one character at a time
+        source : int
+            State to start from
+        target : int
+            State the word must end at
+        end_marker : str
+            Symbol consumed after the word (its output is not emitted)
+
+        Returns:
+        -----------------------------------
+        output : str
+            The transduced word, or None if a transition is missing or
+            ambiguous
+        """
+        fst = self.fst
+        slot, target = fst._slot(source), fst._slot(target)
+        if slot is None or target is None:
+            return(None)
+
+        symbols = list(word)
+        if end_marker is not None:
+            symbols.append(end_marker)
+        symbol_ids = [fst.symbols.id(symbol) for symbol in symbols]
+        epsilon = fst.symbols.id('')
+
+        output, i = [], 0
+        for _ in range(len(symbols) + len(fst._state_ids)):
+            if i == len(symbols) and slot == target:
+                return(''.join(output))
+
+            row = self._row(slot)
+            step = row.get(epsilon) if epsilon is not None else None
+            consumed = False
+            if i < len(symbols):
+                symbol_step = row.get(symbol_ids[i])
+                if symbol_step is not None:
+                    if step is not None:
+                        return(None)
+                    step, consumed = symbol_step, True
+            if step is None or step is self.AMBIGUOUS:
+                return(None)
+
+            (output_id, slot) = step
+            if consumed:
+                i += 1
+            if not (consumed and end_marker is not None and i == len(symbols)):
+                output.append(fst.symbols.symbol(output_id))
+
+        if i == len(symbols) and slot == target:
+            return(''.join(output))
+        return(None)
+
+    def _row(self, slot):
+        row = self._rows.get(slot)
+        if row is None:
+            fst, within, row = self.fst, self._within, {}
+            for arc in fst._out_arc_ids(slot):
+                to_slot = fst._arc_to[arc]
+                if within is not None and to_slot not in within:
+                    continue
+                step = (fst._arc_output[arc], to_slot)
+                input = fst._arc_input[arc]
+                row[input] = step if row.get(input, step) == step else self.AMBIGUOUS
+            self._rows[slot] = row
+        return(row)
+
+
+class PathIndex(object):
+    """
+    The input words of a set of paths, along with the labels of their arcs,
+    stored as flat arrays of symbol-ids so that they can be queried without
+    walking the graph.
+    """
+
+    def __init__(self, fst, arc_paths):
+        """
+        Parameters:
+        -----------------------------------
+        fst : FST
+            The transducer the paths are in
+        arc_paths : iterable
+            The paths, each as a list of arc-ids
+        """
+        self.symbols = fst.symbols
+        self.words = []
+        self._offsets = array('q', [0])
+        self._inputs = array('i')
+        self._outputs = array('i')
+        self._tries = {}
+        self._stripped_words = {}
+        symbol, arc_input, arc_output = fst.symbols.symbol, fst._arc_input, fst._arc_output
+        for arcs in arc_paths:
+            inputs = [arc_input[arc] for arc in arcs]
+            self._inputs.extend(inputs)
+            self._outputs.extend(arc_output[arc] for arc in arcs)
+            self._offsets.append(len(self._inputs))
+            self.words.append(''.join(symbol(input) for input in inputs))
+        self.alphabet = set(''.join(self.words))
+
+    def labels(self, index):
+        """
+        Gives the input-output labels of the arcs of the index-th path
+        Returns:
+        -----------------------------------
+        labels : list[tuple]
+            A list of (input, output) tuples, from the source to the target
+        """
+        symbol = self.symbols.symbol
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return([(symbol(self._inputs[arc]), symbol(self._outputs[arc]))
+                for arc in range(start, end)])
+
+    def trie(self, strip=0):
+        """
+        Gives the trie of the path words, with the last strip characters of
+        each word left out, built on first use
+        """
+        trie = self._tries.get(strip)
+        if trie is None:
+            trie = self._tries[strip] = WordTrie(self.stripped_words(strip))
+        return(trie)
+
+    def stripped_words(self, strip=0):
+        """
+        Gives the path words with their last strip characters left out
+        """
+        words = self._stripped_words.get(strip)
+        if words is None:
+            words = self.words
+            if strip:
+                words = [word[:-strip] for word in words]
+            self._stripped_words[strip] = words
+        return(words)
+
+    def __len__(self):
+        return(len(self.words))
+
+
+def _padding(length):
+    # Number of bytes needed to align length to 8 bytes
+    return(-length % 8)
+
+
+class SlotBitset(object):
+    """
+    A set of FST slots stored as an int bitset, with O(1) membership tests
+    done on a packed byte copy of it.
+    """
+
+    def __init__(self, bits, size):
+        self.bits = bits
+        self._bytes = bits.to_bytes((size >> 3) + 1, 'little')
+
+    @staticmethod
+    def pack(slots, size):
+        """
+        Packs an iterable of slots (all less than size) into an int bitset
+        """
+        packed = bytearray((size >> 3) + 1)
+        for slot in slots:
+            packed[slot >> 3] |= 1 << (slot & 7)
+        return(int.from_bytes(packed, 'little'))
+
+    def __contains__(self, slot):
+        if slot is None or (slot >> 3) >= len(self._bytes):
+            return(False)
+        return((self._bytes[slot >> 3] >> (slot & 7)) & 1 == 1)
+
+    def __len__(self):
+        return(bin(self.bits).count('1'))
+
+
+class FSTView(object):
+    """
+    A read-only view of an FST, restricted to a subset of its states. This is
+    what FST.contextual_subgraph gives back.
+    """
+
+    def __init__(self, fst, slots):
+        self.fst = fst
+        self._slots = slots
+        self._compiled = None
+        self._path_indexes = {}
+
+    def states(self):
+        """
+        Gives all the states present in the view
+        """
+        return([state for state in self.fst.states()
+                if self.fst._slot(state) in self._slots])
+
+    def has_state(self, state):
+        return(self.fst._slot(state) in self._slots)
+
+    def arc(self, from_state, to_state):
+        """
+        Gives the input-output labels of the arc between two states of the
+        view, or None
+        """
+        if not (self.has_state(from_state) and self.has_state(to_state)):
+            return(None)
+        return(self.fst.arc(from_state, to_state))
+
+    def out_arcs(self, state):
+        """
+        Gives the outgoing arcs of a state, within the view
+        """
+        return([(to_state, input, output)
+                for (to_state, input, output) in self.fst.out_arcs(state)
+                if self.has_state(to_state)])
+
+    def arcs(self):
+        """
+        Gives all the edges present in the view
+        """
+        return([(from_state, to_state)
+                for (from_state, to_state) in self.fst.arcs()
+                if self.has_state(from_state) and self.has_state(to_state)])
+
+    def paths(self, source=0, target=-1):
+        """
+        Generates all the simple paths from source to target within the view
+        """
+        return(self.fst._paths(source, target, self._slots))
+
+    def path_index(self, source=0, target=-1):
+        """
+        Gives the input words and the arcs of all the simple paths from source
+        to target within the view, cached along with the view
+        """
+        index = self._path_indexes.get((source, target))
+        if index is None:
+            index = PathIndex(self.fst,
+                              self.fst._path_arcs(source, target, self._slots))
+            self._path_indexes[(source, target)] = index
+        return(index)
+
+    def compile(self):
+        """
+        Gives the deterministic transition table of the view
+        """
+        if self._compiled is None:
+            self._compiled = CompiledFST(self.fst, self._slots)
+        return(self._compiled)
@@ -19,7 +19,7 @@ def is_member(hypothesis, attributes_subset, attributes_superset):
     if it is closed or not.
     Parameters:
     -----------------------------------
-    hypothesis : set
+    hypothesis : fca.Hypothesis
         Hypothesis set under consideration
     attributes_subset : set
         The attribute set to be tested for membership
@@ -58,7 +58,7 @@ def generate_positive_counterexample(H, M, li_times, is_member, is_model,
     Generates positive counterexmample for a given hypothesis set H.
     Parameters:
     -----------------------------------
-    H : set
+    H : fca.Hypothesis
         Hypothesis set
     M : set
         Attribute set
@@ -8,15 +8,20 @@ For theory, refer:
     - https://pdfs.semanticscholar.org/9058/01c8e75daacb27d70ccc3c0b587411b6d213.pdf
 """
 
-import networkx as nx
 from ..core.fst import FST
+from ..helpers import alignments
 from ..helpers.importers import init_concept_from_wordpairs
-from ..helpers.text import is_prefixed_with, eliminate_prefix, eliminate_suffix, lcp, get_io_chunks, align, levenshtein
+from ..helpers.misc import file_hash
+from ..helpers.text import is_prefixed_with, eliminate_prefix, eliminate_suffix, lcp, align, levenshtein, levenshtein_bounded
 
 
 class OSTIA(object):
     """Class to represent OSTIA"""
 
+    # Max number of path words to scan for the closest one, instead of
+    # searching their trie
+    scan_limit = 2048
+
     def __init__(self, T):
         """
         Applies Onward Subsequential Transducer Inference Algorithm
@@ -30,17 +35,22 @@ class OSTIA(object):
 
         if isinstance(T[0], tuple):
             self.graph = self.form_io_digraph(T)
+            self.end_marker = '#'
         else:
             self.graph = self.form_input_digraph(T)
+            self.end_marker = '>'
 
-        tou = tou_dup = self
+        # Merge attempts are undone by rolling the graph back to a savepoint,
+        # rather than by keeping a copy of it
+        tou = self
+        savepoint = tou.graph.begin()
         exit_condition_1 = exit_condition_2 = False
         q = tou.first()
         while q < tou.last():
             q = tou.next(q)
             p = tou.first()
             while p < q and not exit_condition_1:
-                tou_dup = tou
+                savepoint = tou.graph.begin()
                 tou = tou.merge(q, p)
                 while not tou.subseq() and not exit_condition_2:
                     r, a, v, s, w, t = tou.find_subseq_violation()
@@ -54,13 +64,66 @@ class OSTIA(object):
                     tou = tou.merge(t, s)
 
                 if tou.subseq():
+                    # Kept, so its journal is dropped rather than carried
+                    # through the whole training
+                    tou.graph.commit()
                     continue
 
-                tou = tou_dup
+                tou.graph.rollback(savepoint)
                 p = tou.next(p)
 
             if not tou.subseq():
-                tou = tou_dup
+                tou.graph.rollback(savepoint)
+
+        tou.graph.commit()
+
+    def save(self, path, training_file=None):
+        """
+        Saves the learnt transducer to a binary, memory-mappable file.
+        Parameters:
+        -----------------------------------
+        path : str
+            Path of the file to write
+        training_file : str
+            Path of the training data file; its hash is saved along with the
+            transducer, so that a stale model can be detected while loading
+        """
+        training_hash = None
+        if training_file is not None:
+            training_hash = file_hash(training_file)
+        self.graph.save(path, {'training_hash': training_hash,
+                               'end_marker': self.end_marker})
+
+    @classmethod
+    def load(cls, path, training_file=None):
+        """
+        Loads a transducer saved with OSTIA.save, without retraining it.
+        Parameters:
+        -----------------------------------
+        path : str
+            Path of the saved file
+        training_file : str
+            If given, the model is checked to be trained on the current
+            content of this file
+
+        Returns:
+        -----------------------------------
+        ostia : OSTIA
+            The loaded model
+
+        Raises:
+        -----------------------------------
+        ValueError : if the file is not a saved model, or is stale
+        """
+        graph = FST.load(path)
+        if training_file is not None and \
+                graph.info.get('training_hash') != file_hash(training_file):
+            raise ValueError("{} is stale, {} has changed since it was trained".format(
+                path, training_file))
+        ostia = cls.__new__(cls)
+        ostia.graph = graph
+        ostia.end_marker = graph.info.get('end_marker', '#')
+        return(ostia)
 
     def states(self):
         """
@@ -93,17 +156,18 @@ class OSTIA(object):
         """
         Returns the first element in the OTST graph
         """
-        return self.state(0)
+        return self.graph.first_state()
 
     def last(self):
         """
         Returns the last element in the OTST graph
         """
-        return self.state(-1)
+        return self.graph.last_state()
 
     def next(self, a):
         """
-        Returns the state next to a in the OTST graph
+        Returns the state next to a in the OTST graph. If a is not present,
+        the state next to the first present one with an id above a is given.
         Parameters:
         -----------------------------------
         a : int
@@ -115,14 +179,14 @@ class OSTIA(object):
             Next element to a, in the OTST
         """
 
-        all_states = self.states()
-        if a not in all_states:
-            return self.next(a + 1)
-        index_of_a = all_states.index(a)
-        if index_of_a == len(all_states) - 1:
+        graph = self.graph
+        while not graph.has_state(a):
+            if a >= graph.new_state():
+                return self.last()
+            a += 1
+        next_element = graph.next_state(a)
+        if next_element is None:
             next_element = a
-        else:
-            next_element = self.state(index_of_a + 1)
         return next_element
 
     def merge(self, a, b):
@@ -140,20 +204,16 @@ class OSTIA(object):
         """
         graph = self.graph
 
-        for (from_state, _) in graph.in_edges(b):
-            try:
-                input = graph[from_state][b]['input']
-                output = graph[from_state][b]['output']
-                graph.add_edge(from_state, a, input=input, output=output)
-            except KeyError:
-                graph.add_edge(from_state, a)
+        for (from_state, input, output) in graph.in_arcs(b):
+            graph.add_arc(from_state, input, output, a)
 
-        for to_state in graph[b]:
-            input = graph[b][to_state]['input']
-            output = graph[b][to_state]['output']
-            graph.add_edge(a, to_state, input=input, output=output)
+        for metadata in graph.state_metadatas(b):
+            graph.link_metadata(metadata, a)
 
-        graph.remove_node(b)
+        for (to_state, input, output) in graph.out_arcs(b):
+            graph.add_arc(a, input, output, to_state)
+
+        graph.remove_state(b)
         self.graph = graph
         return self
 
@@ -169,21 +229,22 @@ class OSTIA(object):
         Finds subsequential violations in the OTST graph
         (r,a,v,s) and (r,a,w,t) are 2 edges of tou that violate subseq condition,
         with s<t
+
+        Only the states touched by a merge / push_back since they were last
+        checked can have a violation, so just those are checked, with their
+        arcs indexed by input. The ones found without a violation are marked
+        as checked.
         """
 
         graph = self.graph
-        states = self.states()
 
-        for state in states:
-            neighbors = graph[state]
-            for neighbor_1 in neighbors:
-                for neighbor_2 in neighbors:
-                    if neighbor_1 == neighbor_2:
-                        continue
-                    edge_1 = graph[state][neighbor_1]
-                    edge_2 = graph[state][neighbor_2]
-                    if edge_1['input'] == edge_2['input'] and edge_1['output'] == edge_2['output']:
-                        return((state, edge_1['input'], edge_1['output'], neighbor_1, edge_2['output'], neighbor_2))
+        for state in graph.touched_states():
+            arcs_by_input = graph.out_arcs_by_input(state)
+            for (neighbor_1, input, output_1) in graph.out_arcs(state):
+                for (neighbor_2, output_2) in arcs_by_input[input]:
+                    if neighbor_1 != neighbor_2 and output_1 == output_2:
+                        return((state, input, output_1, neighbor_1, output_2, neighbor_2))
+            graph.untouch(state)
 
     def push_back(self, element, edge):
         """
@@ -203,119 +264,135 @@ class OSTIA(object):
         graph = self.graph
         input_state, input_text, output_text, output_state = edge
 
-        graph[input_state][output_state]['output'] = eliminate_suffix(
-            output_text, element)
-        outgoing_states = graph[output_state]
-        for state in outgoing_states:
-            graph[output_state][state]['output'] = element + \
-                graph[output_state][state]['output']
+        graph.set_output(input_state, output_state,
+                         eliminate_suffix(output_text, element))
+        for (state, _, output) in graph.out_arcs(output_state):
+            graph.set_output(output_state, state, element + output)
 
         self.graph = graph
         return self
 
     def form_io_digraph(self, T):
         """
-        :param T: A set of all input/output pairs
-        :return graph: A directed networkx graph
+        Forms the prefix-tree transducer of the given input-output pairs.
+        Pairs sharing a prefix of io chunks share the states along it, and
+        every state is linked to the metadatas of all the pairs through it.
+        The state a pair ends at, which holds its '#' arc, is only shared by
+        the pairs with the same metadatas ending there: a longer word going
+        through it would otherwise bring the word ending there into its own
+        context.
+        Parameters:
+        -----------------------------------
+        T: list
+            A set of all input, metadata and output pairs
+
+        Returns:
+        -----------------------------------
+        graph: FST
+            The prefix-tree transducer formed from the given io pairs
         """
 
         graph = FST()
-        input_arcs = []
-        output_arcs = []
+        graph.add_state(0)
+        children = {}
+        state_metadatas = {}
+        final_states = {}
 
         for (input_word, metadatas, output_word) in T:
             for metadata in metadatas:
                 graph.add_metadata(metadata)
 
-            io_chunks = get_io_chunks(input_word, output_word) + [('#', '#')]
-
+            state = 0
+            io_chunks = alignments.table.chunks(input_word, output_word)
             for (i, (input_chunk, output_chunk)) in enumerate(io_chunks):
-                if i == 0:
-                    to_state = graph.add_state()
-                    for metadata in metadatas:
-                        graph.add_edge(metadata, to_state)
-                    input_arcs.append((input_chunk, output_chunk, to_state))
-                elif i == len(io_chunks) - 1:
-                    from_state = to_state
-                    for metadata in metadatas:
-                        graph.add_edge(metadata, from_state)
-                    output_arcs.append((from_state, input_chunk, output_chunk))
-                else:
-                    from_state = to_state
-                    to_state = graph.add_state()
-                    for metadata in metadatas:
-                        graph.add_edge(metadata, from_state)
-                        graph.add_edge(metadata, to_state)
-                    graph.add_arc(
-                        from_state,
-                        input_chunk,
-                        output_chunk,
-                        to_state)
+                context = frozenset(metadatas) if i == len(io_chunks) - 1 else None
+                state = self.prefix_child(graph, children, state,
+                                          input_chunk, output_chunk, context)
+                state_metadatas.setdefault(state, set()).update(metadatas)
+            final_states[state] = True
 
-        graph.add_state(0)
         graph.add_state(-1)
 
-        for metadata in graph.metadatas():
-            graph.add_edge(metadata, 0)
-            graph.add_edge(metadata, -1)
+        for (state, metadatas) in state_metadatas.items():
+            for metadata in sorted(metadatas):
+                graph.link_metadata(metadata, state)
 
-        for (input_chunk, output_chunk, to_state) in input_arcs:
-            graph.add_arc(0, input_chunk, output_chunk, to_state)
+        for metadata in graph.metadatas():
+            graph.link_metadata(metadata, 0)
+            graph.link_metadata(metadata, -1)
 
-        for (from_state, input_chunk, output_chunk) in output_arcs:
-            graph.add_arc(from_state, input_chunk, output_chunk, -1)
+        for state in final_states:
+            graph.add_arc(state, '#', '#', -1)
 
         verbose_print_2("Done forming the directed FST graph")
         return(graph)
 
     def form_input_digraph(self, T):
         """
-        Forms a directed network from the given input-output pairs
+        Forms the prefix tree of the given input words, with identical input
+        and output on every arc
         Parameters:
         -----------------------------------
         T: list
-            A set of all input/output pairs
+            A set of all input words
 
         Returns:
         -----------------------------------
         graph: FST
-            A directed networkx graph formed from the given io pairs
+            The prefix-tree transducer formed from the given words
         """
         graph = FST()
-        input_arcs = []
-        output_arcs = []
+        graph.add_state(0)
+        children = {}
+        final_states = {}
 
         for input_word in T:
-            io_chunks = list(input_word) + ['>']
-
-            for (i, input_chunk) in enumerate(io_chunks):
-                if i == 0:
-                    to_state = graph.add_state()
-                    input_arcs.append((input_chunk, input_chunk, to_state))
-                elif i == len(io_chunks) - 1:
-                    from_state = to_state
-                    output_arcs.append((from_state, input_chunk, input_chunk))
-                else:
-                    from_state = to_state
-                    to_state = graph.add_state()
-                    graph.add_arc(
-                        from_state,
-                        input_chunk,
-                        input_chunk,
-                        to_state)
+            state = 0
+            for input_chunk in input_word:
+                state = self.prefix_child(graph, children, state,
+                                          input_chunk, input_chunk)
+            final_states[state] = True
 
-        graph.add_state(0)
         graph.add_state(-1)
 
-        for (input_chunk, output_chunk, to_state) in input_arcs:
-            graph.add_arc(0, input_chunk, input_chunk, to_state)
-
-        for (from_state, input_chunk, output_chunk) in output_arcs:
-            graph.add_arc(from_state, input_chunk, input_chunk, -1)
+        for state in final_states:
+            graph.add_arc(state, '>', '>', -1)
 
         verbose_print_2("Done forming the directed FST graph")
         return(graph)
 
+    def prefix_child(self, graph, children, state, input_chunk, output_chunk,
+                     context=None):
+        """
+        Gives the child of a prefix-tree state along an input-output chunk,
+        adding the child state and its arc if they don't exist yet
+        Parameters:
+        -----------------------------------
+        graph : FST
+            The prefix tree being formed
+        children : dict
+            Maps (state, input_chunk, output_chunk, context) to the existing
+            children
+        state : int
+            The parent state
+        input_chunk, output_chunk : str
+            Labels of the arc to the child
+        context : frozenset
+            If given, the child is a final state only shared by the pairs of
+            these metadatas (Default: None, an inner state)
+
+        Returns:
+        -----------------------------------
+        child : int
+            Id of the child state
+        """
+        key = (state, input_chunk, output_chunk, context)
+        child = children.get(key)
+        if child is None:
+            child = children[key] = graph.add_state()
+            graph.add_arc(state, input_chunk, output_chunk, child)
+        return(child)
+
     def word_from_path(self, graph, path):
         """
         Get the word represented by a path in OTST
@@ -333,8 +410,8 @@ class OSTIA(object):
         """
         path_input_word = ''
         for i in range(0, len(path) - 1):
-            edge = graph[path[i]][path[i + 1]]
-            path_input_word += edge['input']
+            input, _ = graph.arc(path[i], path[i + 1])
+            path_input_word += input
         return path_input_word
 
     def matches_any_path(self, new_word):
@@ -346,26 +423,92 @@ class OSTIA(object):
         new_word : str
             The word to be matched
         """
-        graph = self.graph
-        words = []
-        for path in list(nx.all_simple_paths(graph, 0, -1)):
-            words.append(self.word_from_path(graph, list(path)))
-        min_ldist = len(new_word)
+        path_index = self.graph.path_index(0, -1)
+        min_ldist, index = self.closest_path(path_index, new_word, strip=1)
         closest_word = new_word
-        for word in words:
-            word = word[:-1]
+        if index != -1:
+            closest_word = path_index.words[index][:-1]
+        return((min_ldist, closest_word))
+
+    def closest_path(self, path_index, new_word, strip=0):
+        """
+        Finds the path whose word is the most similar to new_word, i.e with
+        the least aligned edit distance per character of new_word. Ties go to
+        the earliest path.
+        Parameters:
+        -----------------------------------
+        path_index : PathIndex
+            The paths to search in
+        new_word : str
+            The word to be matched
+        strip : int
+            Number of trailing characters (end markers) to leave out of the
+            path words
+
+        Returns:
+        -----------------------------------
+        min_ldist, index : tuple
+            The score of the closest path and its index, or (len(new_word), -1)
+            if no path scores lower than that
+        """
+        min_ldist = len(new_word)
+
+        # The aligned distance (prefix, root and suffix compared apart) is the
+        # plain edit distance, unless '_' (a gap for align) is in the words.
+        # Up to a few thousand words, scanning them beats the trie, each word
+        # being rejected as soon as it can't beat the closest one so far.
+        if '_' not in new_word and '_' not in path_index.alphabet:
+            if len(path_index) <= self.scan_limit:
+                distance, index = min_ldist * len(new_word), -1
+                for (i, word) in enumerate(path_index.stripped_words(strip)):
+                    word_distance = levenshtein_bounded(new_word, word, distance - 1)
+                    if word_distance is not None:
+                        distance, index = word_distance, i
+            else:
+                distance, index = path_index.trie(strip).nearest(
+                    new_word, len(new_word) * min_ldist)
+            if index != -1:
+                min_ldist = float(distance) / len(new_word)
+            return((min_ldist, index))
+
+        closest_index = -1
+        for i, word in enumerate(path_index.words):
+            word = word[:len(word) - strip]
             lp, lr, ls, rp, rr, rs = align(word, new_word)
             score = levenshtein(lp, rp)[-1] + levenshtein(ls, rs)[-1] + levenshtein(lr, rr)[-1]
             score = float(score) / len(new_word)
             if score < min_ldist:
                 min_ldist = score
-                closest_word = word
-        return((min_ldist, closest_word))
+                closest_index = i
+        return((min_ldist, closest_index))
+
+    def transduce(self, source, metadatas=None):
+        """
+        Runs the learnt transducer on a word, in a single left-to-right pass
+        over the compiled transition table of the given context.
+        Parameters:
+        -----------------------------------
+        source : str
+            Source word to be transduced
+        metadatas: list
+            Array of metadatas to be considered for a language
+
+        Returns:
+        -----------------------------------
+        prediction : str
+            The transduced word, or None if the word is not covered
+            deterministically by the transducer
+        """
+        graph = self.graph
+        if metadatas is not None:
+            graph = graph.contextual_subgraph(metadatas)
+        return(graph.compile().transduce(source, 0, -1, self.end_marker))
 
     def fit_closest_path(self, source, metadatas):
         """
         Tries to apply the transitions of the most compatible path to get the
-        predicted word
+        predicted word. Words covered by the transducer are transduced
+        directly, and the closest path is searched for only otherwise.
         Parameters:
         -----------------------------------
         source : str
@@ -373,39 +516,32 @@ class OSTIA(object):
         metadatas: list
             Array of metadatas to be considered for a language
         """
+        prediction = self.transduce(source, metadatas)
+        if prediction is not None:
+            return((prediction, source + self.end_marker))
+
         graph = self.graph
         graph = graph.contextual_subgraph(metadatas)
 
-        source_words = []
-        for path in list(nx.all_simple_paths(graph, 0, -1)):
-            source_words.append(self.word_from_path(graph, list(path)))
-        min_ldist = len(source)
-        closest_word_index = -1
-
-        for i, word in enumerate(source_words):
-            lp, lr, ls, rp, rr, rs = align(word, source)
-            score = levenshtein(lp, rp)[-1] + levenshtein(ls, rs)[-1] + levenshtein(lr, rr)[-1]
-            score = float(score) / len(source)
-            if score < min_ldist:
-                min_ldist = score
-                closest_word_index = i
+        # Words and arcs of the paths are indexed once per context
+        path_index = graph.path_index(0, -1)
+        source_words = path_index.words
+        min_ldist, closest_word_index = self.closest_path(path_index, source)
 
         if closest_word_index == -1:
             return((source, ''))
 
         closest_word = source_words[closest_word_index]
-        fitting_path = list(nx.all_simple_paths(graph, 0, -1))[closest_word_index]
         prediction = ''
 
         j = 0
-        for i in range(0, len(fitting_path) - 1):
-            edge = graph[fitting_path[i]][fitting_path[i + 1]]
-            if edge['input'] == edge['output'] and j < len(source):
+        for (input, output) in path_index.labels(closest_word_index):
+            if input == output and j < len(source):
                 prediction += source[j]
                 j += 1
-            elif edge['input'] == '':
-                prediction += edge['output']
-            elif edge['output'] == '':
+            elif input == '':
+                prediction += output
+            elif output == '':
                 j += 1
 
         if j < len(source):
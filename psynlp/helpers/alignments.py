@@ -0,0 +1,215 @@
+"""
+Contains the alignments of the (source, dest) pairs of the training files:
+the io chunks OSTIA is trained on, and the added / deleted substrings the
+formal concepts are built from. The pairs of a file are aligned once, across
+a pool of processes if asked for, and can be saved to a cache keyed by the
+file's hash.
+
+A pool re-imports the __main__ module in its workers under the spawn and
+forkserver start methods, so scripts asking for one must be guarded with
+`if __name__ == '__main__':`.
+"""
+
+import os
+import pickle
+import zlib
+from multiprocessing import Pool
+
+from .misc import file_hash
+from .text import get_io_chunks, iterLCS
+
+# Version of the cache files, bumped whenever the alignments change
+CACHE_VERSION = 1
+
+# Stands for the empty side of an io chunk, in the aligned strings
+GAP = '\x00'
+
+# Least number of pairs worth sending to a pool of processes
+MIN_POOL_PAIRS = 512
+
+
+def align_pair(pair):
+    """
+    Aligns a (source, dest) pair
+    Parameters:
+    -----------------------------------
+    pair : tuple
+        The source and the dest words
+
+    Returns:
+    -----------------------------------
+    alignment : tuple
+        The input and the output sides of the io chunks, as two strings of the
+        same length with GAP for an empty side, and the tuples of the added
+        and of the deleted substrings
+    """
+    source, dest = pair
+    chunks = get_io_chunks(source, dest)
+    mutations = iterLCS({'source': source, 'target': dest})
+    return((''.join(input_chunk or GAP for (input_chunk, _) in chunks),
+            ''.join(output_chunk or GAP for (_, output_chunk) in chunks),
+            tuple(mutations['added']), tuple(mutations['deleted'])))
+
+
+def align_pairs(pairs, processes=1):
+    """
+    Aligns (source, dest) pairs, across a pool of processes if there are
+    enough of them
+    Parameters:
+    -----------------------------------
+    pairs : list[tuple]
+        The source and dest words to align
+    processes : int
+        Number of processes to use, None for one per CPU (Default: 1, no pool)
+
+    Returns:
+    -----------------------------------
+    alignments : dict
+        The alignment (see align_pair) of each pair
+    """
+    pairs = list(pairs)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = min(processes, len(pairs) // MIN_POOL_PAIRS)
+    if processes <= 1:
+        return(dict(zip(pairs, map(align_pair, pairs))))
+
+    with Pool(processes) as pool:
+        chunksize = max(1, len(pairs) // (4 * processes))
+        return(dict(zip(pairs, pool.map(align_pair, pairs, chunksize))))
+
+
+def read_pairs(filepath):
+    """
+    Reads the (source, dest) pairs of a training data file, leaving out the
+    ones with unknown ('*') words as the importers do
+    """
+    pairs = []
+    with open(filepath, 'r') as file:
+        for line in file.readlines():
+            source, dest, _ = line.split("\t")
+            if "*" not in source and "*" not in dest:
+                pairs.append((source, dest))
+    return(pairs)
+
+
+class AlignmentTable(object):
+    """
+    Holds the alignments of all the training files read so far, computing the
+    ones of other pairs as they are asked for.
+    """
+
+    def __init__(self, cache_dir=None, processes=1):
+        """
+        Parameters:
+        -----------------------------------
+        cache_dir : str
+            Directory where the alignments of each training file are saved
+            and loaded from (Default: None, never saved)
+        processes : int
+            Number of processes aligning a training file, None for one per
+            CPU (Default: 1, no pool)
+        """
+        self.cache_dir = cache_dir
+        self.processes = processes
+        self._alignments = {}
+        self._files = set()
+
+    def load(self, filepath):
+        """
+        Aligns all the pairs of a training data file, or loads their
+        alignments from the cache if the file has been aligned before
+        Parameters:
+        -----------------------------------
+        filepath : str
+            Path of the training data file
+        """
+        digest = file_hash(filepath)
+        if digest in self._files:
+            return
+        alignments = None
+        if self.cache_dir is not None:
+            cache_path = os.path.join(self.cache_dir, "{}.alignments".format(digest))
+            try:
+                alignments = self.read(cache_path)
+                verbose_print_2("Loaded the alignments of {}".format(filepath))
+            except (OSError, ValueError) as error:
+                verbose_print_2("Realigning {}: {}".format(filepath, error))
+
+        if alignments is None:
+            alignments = align_pairs(read_pairs(filepath), self.processes)
+            verbose_print_2("Aligned {} pairs of {}".format(len(alignments), filepath))
+            if self.cache_dir is not None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                self.write(cache_path, alignments)
+        self._alignments.update(alignments)
+        self._files.add(digest)
+
+    @staticmethod
+    def read(path):
+        """
+        Reads alignments saved with AlignmentTable.write
+
+        Raises:
+        -----------------------------------
+        ValueError : if the file doesn't hold alignments of this version
+        """
+        with open(path, 'rb') as file:
+            try:
+                version, alignments = pickle.loads(zlib.decompress(file.read()))
+            except (zlib.error, pickle.UnpicklingError, EOFError, TypeError) as error:
+                raise ValueError("{} is not an alignments file ({})".format(path, error))
+        if version != CACHE_VERSION:
+            raise ValueError("{} holds alignments of version {}, not {}".format(
+                path, version, CACHE_VERSION))
+        return(alignments)
+
+    @staticmethod
+    def write(path, alignments):
+        """
+        Saves alignments to a compressed file, replacing it atomically so
+        that concurrent runs never read a partial file
+        """
+        partial_path = "{}.{}".format(path, os.getpid())
+        with open(partial_path, 'wb') as file:
+            file.write(zlib.compress(pickle.dumps(
+                (CACHE_VERSION, alignments), pickle.HIGHEST_PROTOCOL)))
+        os.replace(partial_path, path)
+
+    def alignment(self, source, dest):
+        """
+        Gives the alignment (see align_pair) of a pair
+        """
+        alignment = self._alignments.get((source, dest))
+        if alignment is None:
+            alignment = self._alignments[(source, dest)] = align_pair((source, dest))
+        return(alignment)
+
+    def chunks(self, source, dest):
+        """
+        Gives the io chunks of a pair, as get_io_chunks does
+        """
+        input_side, output_side, _, _ = self.alignment(source, dest)
+        return([(input_chunk.strip(GAP), output_chunk.strip(GAP))
+                for (input_chunk, output_chunk) in zip(input_side, output_side)])
+
+    def mutations(self, source, dest):
+        """
+        Gives the added and deleted substrings of a pair, as iterLCS does
+        """
+        _, _, added, deleted = self.alignment(source, dest)
+        return({'added': list(added), 'deleted': list(deleted)})
+
+    def clear(self):
+        """
+        Drops all the alignments held
+        """
+        self._alignments.clear()
+        self._files.clear()
+
+    def __len__(self):
+        return(len(self._alignments))
+
+
+# The alignments shared by the importers and OSTIA
+table = AlignmentTable()
@@ -0,0 +1,103 @@
+class BKTree(object):
+    """
+    A Burkhard-Keller tree, indexing words by a metric (such as the edit
+    distance) for closest-word queries. Each child of a node is keyed by its
+    distance to the node, so the triangle inequality rules out the subtrees
+    that can't hold a word closer than the best one found.
+
+    Every word carries a list of labels, e.g the clusters it belongs to.
+    """
+
+    def __init__(self, distance, bounded_distance=None):
+        """
+        Parameters:
+        -----------------------------------
+        distance : function
+            Metric between two words, giving an integer (valued) distance
+        bounded_distance : function
+            If given, the same metric taking a bound as third argument, and
+            giving None when the distance exceeds it. Searches then only
+            compute distances up to what can still change their result.
+        """
+        self.distance = distance
+        self.bounded_distance = bounded_distance
+        self._words = []
+        self._labels = []
+        self._children = []
+        # largest distance from each node to one of its children
+        self._reach = []
+
+    def add(self, word, label):
+        """
+        Adds a word with a label, appending the label if the word is already
+        present
+        """
+        if not self._words:
+            self._new_node(word, label)
+            return
+
+        node = 0
+        while True:
+            distance = self.distance(word, self._words[node])
+            if distance == 0:
+                self._labels[node].append(label)
+                return
+            child = self._children[node].get(distance)
+            if child is None:
+                self._children[node][distance] = self._new_node(word, label)
+                self._reach[node] = max(self._reach[node], distance)
+                return
+            node = child
+
+    def search(self, query, max_distance):
+        """
+        Finds all the words at the least distance from the query, among the
+        ones closer than max_distance.
+        Parameters:
+        -----------------------------------
+        query : str
+            The word to be matched
+        max_distance : int
+            Only words at a distance strictly lower than this are considered
+
+        Returns:
+        -----------------------------------
+        distance, matches : tuple
+            The least distance, and a list of (word, labels) tuples of the
+            words at that distance in the order they were added, or
+            (max_distance, []) if no word is close enough
+        """
+        best_distance, best_nodes = max_distance, []
+        stack = [0] if self._words else []
+        while stack:
+            node = stack.pop()
+            if self.bounded_distance is None:
+                distance = self.distance(query, self._words[node])
+            else:
+                # Farther than this, neither the node nor any of its children
+                # can be a match
+                distance = self.bounded_distance(
+                    query, self._words[node], best_distance + self._reach[node])
+                if distance is None:
+                    continue
+            if distance < best_distance:
+                best_distance, best_nodes = distance, [node]
+            elif distance == best_distance < max_distance:
+                best_nodes.append(node)
+
+            for (edge, child) in self._children[node].items():
+                if distance - best_distance <= edge <= distance + best_distance:
+                    stack.append(child)
+
+        return((best_distance, [(self._words[node], self._labels[node])
+                                for node in sorted(best_nodes)]))
+
+    def _new_node(self, word, label):
+        self._words.append(word)
+        self._labels.append([label])
+        self._children.append({})
+        self._reach.append(0)
+        return(len(self._words) - 1)
+
+    def __len__(self):
+        return(len(self._words))
@@ -0,0 +1,71 @@
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    A dictionary-like cache, bounded to maxsize entries, that evicts the least
+    recently used entry when full. It counts its hits, misses and evictions,
+    to tell how well a maxsize suits a workload.
+    """
+
+    def __init__(self, maxsize=128):
+        """
+        Parameters:
+        -----------------------------------
+        maxsize : int
+            Maximum number of entries to hold. None means unbounded.
+        """
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None):
+        """
+        Returns the value cached for key (marking it as recently used), or
+        default if key is not cached
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return(default)
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return(value)
+
+    def put(self, key, value):
+        """
+        Caches value for key, evicting the least recently used entries if the
+        cache is full
+        """
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if self.maxsize is not None:
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Empties the cache, keeping its counters
+        """
+        self._entries.clear()
+
+    def stats(self):
+        """
+        Gives the counters of the cache
+        Returns:
+        -----------------------------------
+        stats : dict
+            Number of hits, misses and evictions so far, along with the
+            current size and the maxsize of the cache
+        """
+        return({'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'size': len(self._entries),
+                'maxsize': self.maxsize})
+
+    def __contains__(self, key):
+        return(key in self._entries)
+
+    def __len__(self):
+        return(len(self._entries))
@@ -2,11 +2,29 @@ import time
 import operator
 
 from ..core import oracle
-from .text import iterLCS
+from . import alignments
 from ..core.fca import FCA
 from .misc import deterministic_pac
 
 
+def training_filepath(language='english', quality='low'):
+    """
+    Gives the path of the training data file of a language
+    Parameters:
+    -----------------------------------
+    language : str
+        Name of the language
+    quality : str
+        size of the dataset to consider
+
+    Returns:
+    -----------------------------------
+    filepath : str
+        Path of the training data file
+    """
+    return("psynlp/data/{}-train-{}".format(language, quality))
+
+
 def fetch_testing_data(language='english'):
     """
     Fetches testing data given a language
@@ -50,7 +68,8 @@ def parse_metadata_words(language='english', quality='low'):
         A dictionary with all the words grouped by metadata
     """
     metadata_words = {}
-    filepath = "psynlp/data/{}-train-{}".format(language, quality)
+    filepath = training_filepath(language, quality)
+    alignments.table.load(filepath)
     file = open(filepath, 'r')
     for line in file.readlines():
         source, dest, metadata = line.split("\t")
@@ -71,7 +90,9 @@ def parse_metadata_fca(metadata_words, cluster_type='pac'):
     metadata_words : dict
         A dictionary with all the words grouped by metadata
     cluster_type : str
-        clustering algo to use while grouping
+        clustering algo to use while grouping: 'pac' for the PAC-basis,
+        'canonical' for the exact canonical basis (deterministic, but
+        exponential in the worst case), else deterministic_pac
 
     Returns:
     -----------------------------------
@@ -84,12 +105,15 @@ def parse_metadata_fca(metadata_words, cluster_type='pac'):
         wordpairs = metadata_words[metadata]
         concept = init_concept_from_wordpairs(wordpairs)
         if len(concept.objects()) > 0:
-            start1 = time.clock()
+            start1 = time.process_time()
             if cluster_type == 'pac':
                 pac = concept.pac_basis(oracle.is_member, 1.0, 1.0)
+            elif cluster_type == 'canonical':
+                # Sorted, so that the same implications are kept on every run
+                pac = concept.clean_hypothesis(sorted(concept.canonical_basis()))
             else:
                 pac = deterministic_pac(concept)
-            end1 = time.clock() - start1
+            end1 = time.process_time() - start1
         else:
             pac, end1 = None, None
         metadata_fca[metadata] = (concept, pac, end1)
@@ -112,7 +136,8 @@ def fetch_input_output_pairs(language='english', quality='low'):
         List of tuples from the training dataset of the language sorted
         alphabetically
     """
-    filepath = "psynlp/data/{}-train-{}".format(language, quality)
+    filepath = training_filepath(language, quality)
+    alignments.table.load(filepath)
     T = list()
     file = open(filepath, 'r')
     for line in file.readlines():
@@ -142,7 +167,7 @@ def init_concept_from_wordpairs(wordpairs):
     concept = FCA()
     for (source, target) in wordpairs:
         if "*" not in source and "*" not in target:
-            mutations = iterLCS({'source': source, 'target': target})
+            mutations = alignments.table.mutations(source, target)
             for addition in mutations['added']:
                 concept.add_relation("insert_"+addition, source)
             for deletion in mutations['deleted']:
@@ -1,3 +1,4 @@
+import hashlib
 import pandas as pd
 
 
@@ -71,3 +72,23 @@ def deterministic_pac(concept):
     df = generate_df(concept)
     pac = structure_df_to_pac(df)
     return pac
+
+
+def file_hash(filepath):
+    """
+    Computes the hash of a file's content, to tell if the file has changed.
+    Parameters:
+    -----------------------------------
+    filepath : str
+        Path of the file to be hashed
+
+    Returns:
+    -----------------------------------
+    digest : str
+        Hex digest (sha256) of the file's content
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 16), b''):
+            digest.update(block)
+    return(digest.hexdigest())
@@ -1,6 +1,6 @@
 import os
-import re
-from functools import wraps
+from array import array
+from .cache import LRUCache
 
 
 def align(lemma, form):
@@ -14,6 +14,9 @@ emminga str
        words tstr
         o be aligned
     """
+    parts = alignment_cache.get((lemma, form))
+    if parts is not None:
+        return(parts)
     alemma, aform, _ = levenshtein(lemma, form)
     lspace = max(len(alemma) - len(alemma.lstrip('_')),
                  len(aform) - len(aform.lstrip('_')))
@@ -27,48 +30,224 @@ emminga str
     rr = aform[lspace:len(alemma) - tspace].replace('_', '')
     rs = aform[len(alemma) - tspace:].replace('_', '')
 
-    return((lp, lr, ls, rp, rr, rs))
+    parts = (lp, lr, ls, rp, rr, rs)
+    alignment_cache.put((lemma, form), parts)
+    return(parts)
 
 
 def levenshtein(s, t, inscost=1.0, delcost=1.0, substcost=1.0):
     """
-    Recursive implementation of Levenshtein, with alignments returned.
+    Iterative implementation of Levenshtein, with alignments returned.
+
+    The cost of aligning every pair of suffixes of s and t is filled in
+    bottom-up (into a buffer reused across calls), and the alignment is then
+    traced from the start, taking a substitution (or match) over an insertion
+    over a deletion when they cost the same. Characters left over once either
+    string is exhausted cost 1 each.
+    Parameters:
+    -----------------------------------
+    s, t : str
+        Strings to be aligned
+    inscost, delcost, substcost : float
+        Costs of inserting a character of t, deleting a character of s and
+        substituting one for the other
+
+    Returns:
+    -----------------------------------
+    aligned_s, aligned_t, cost : tuple
+        s and t padded with '_' at the gaps, and the cost of the alignment
     """
-    @memolrec
-    def lrec(spast, tpast, srem, trem, cost):
-        if len(srem) == 0:
-            return spast + len(trem) * '_', tpast + \
-                trem, '', '', cost + len(trem)
-        if len(trem) == 0:
-            return spast + srem, tpast + \
-                len(srem) * '_', '', '', cost + len(srem)
+    key = (s, t, inscost, delcost, substcost)
+    alignment = alignment_cache.get(key)
+    if alignment is not None:
+        return(alignment)
+
+    global _costs
+    m, n = len(s), len(t)
+    width = n + 1
+    if len(_costs) < (m + 1) * width:
+        _costs = array('d', bytes(8 * (m + 1) * width))
+    costs = _costs
+
+    last = m * width
+    for j in range(width):
+        costs[last + j] = n - j
+    for i in range(m):
+        costs[i * width + n] = m - i
+    for i in range(m - 1, -1, -1):
+        row, below, s_char = i * width, (i + 1) * width, s[i]
+        for j in range(n - 1, -1, -1):
+            diagonal = costs[below + j + 1]
+            if s_char != t[j]:
+                diagonal += substcost
+            insertion = costs[row + j + 1] + inscost
+            deletion = costs[below + j] + delcost
+            if diagonal <= insertion and diagonal <= deletion:
+                costs[row + j] = diagonal
+            elif insertion <= deletion:
+                costs[row + j] = insertion
+            else:
+                costs[row + j] = deletion
+
+    aligned_s, aligned_t = [], []
+    i = j = 0
+    while i < m and j < n:
+        row, below = i * width, (i + 1) * width
+        diagonal = costs[below + j + 1]
+        if s[i] != t[j]:
+            diagonal += substcost
+        insertion = costs[row + j + 1] + inscost
+        deletion = costs[below + j] + delcost
+        if diagonal <= insertion and diagonal <= deletion:
+            aligned_s.append(s[i])
+            aligned_t.append(t[j])
+            i, j = i + 1, j + 1
+        elif insertion <= deletion:
+            aligned_s.append('_')
+            aligned_t.append(t[j])
+            j += 1
+        else:
+            aligned_s.append(s[i])
+            aligned_t.append('_')
+            i += 1
+    if i == m:
+        aligned_s.append('_' * (n - j))
+        aligned_t.append(t[j:])
+    else:
+        aligned_s.append(s[i:])
+        aligned_t.append('_' * (m - i))
+
+    alignment = (''.join(aligned_s), ''.join(aligned_t), costs[0])
+    alignment_cache.put(key, alignment)
+    return alignment
 
-        addcost = 0
-        if srem[0] != trem[0]:
-            addcost = substcost
 
-        return min((lrec(spast + srem[0], tpast + trem[0], srem[1:], trem[1:], cost + addcost),
-                    lrec(spast + '_', tpast + trem[0], srem, trem[1:], cost + inscost),
-                    lrec(spast + srem[0], tpast + '_', srem[1:], trem, cost + delcost)),
-                   key=lambda x: x[4])
+# Suffix-cost matrix of levenshtein, grown as needed and reused
+_costs = array('d')
 
-    answer = lrec('', '', s, t, 0)
-    return answer[0], answer[1], answer[4]
+# Results of align, keyed by the (lemma, form) pair, and of levenshtein, keyed
+# by the (s, t) pair and the costs. Shared by the whole process, and bounded so
+# that long runs on high-resource languages don't keep every pair ever seen;
+# its stats() tell whether maxsize is worth raising.
+alignment_cache = LRUCache(1 << 15)
 
 
-def memolrec(func):
+def edit_distance(s, t):
+    """
+    Levenshtein distance between two strings with unit costs, computed row by
+    row without the alignments.
+    Parameters:
+    -----------------------------------
+    s, t : str
+        Strings to be compared
+
+    Returns:
+    -----------------------------------
+    distance : int
+        Least number of insertions, deletions and substitutions turning s
+        into t
+    """
+    row = list(range(len(t) + 1))
+    for (i, s_char) in enumerate(s, 1):
+        previous, row[0] = row[0], i
+        for (j, t_char) in enumerate(t, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1,
+                                           previous + (s_char != t_char))
+    return(row[-1])
+
+
+def levenshtein_bounded(s, t, max_cost):
+    """
+    Levenshtein distance (unit costs) between two strings, if it is at most
+    max_cost, rejecting early the pairs that are farther apart. The common
+    prefix and suffix are left out, pairs whose lengths differ by more than
+    max_cost are rejected outright, and the rest are given up on as soon as
+    the distance is known to exceed max_cost (see levenshtein_many).
+    Parameters:
+    -----------------------------------
+    s, t : str
+        Strings to be compared
+    max_cost : int
+        The bound on the distance
+
+    Returns:
+    -----------------------------------
+    distance : int
+        The distance, or None if it exceeds max_cost
     """
-    Memoizer for Levenshtein. Make the algo run significantly faster
+    m, n = len(s), len(t)
+    if max_cost < 0 or abs(m - n) > max_cost:
+        return(None)
+
+    start = 0
+    while start < m and start < n and s[start] == t[start]:
+        start += 1
+    while m > start and n > start and s[m - 1] == t[n - 1]:
+        m, n = m - 1, n - 1
+    if start == m or start == n:
+        return(max(m, n) - start)
+    return(levenshtein_many(s[start:m], [t[start:n]], max_cost)[0])
+
+
+def levenshtein_many(query, candidates, max_distance=None):
     """
-    cache = {}
+    Levenshtein distances (unit costs) from a query to many candidates, using
+    Myers' bit-parallel algorithm: the column of the DP table for the query
+    is kept as bit-vectors of +1/-1 deltas in Python ints, and updated for a
+    whole column per character of a candidate.
+    Parameters:
+    -----------------------------------
+    query : str
+        The word to compare the candidates with
+    candidates : iterable
+        The words to compare with the query
+    max_distance : int
+        If given, a candidate is given up on as soon as its distance is known
+        to exceed max_distance
 
-    @wraps(func)
-    def wrap(sp, tp, sr, tr, cost):
-        if (sr, tr) not in cache:
-            res = func(sp, tp, sr, tr, cost)
-            cache[(sr, tr)] = (res[0][len(sp):], res[1][len(tp):], res[4] - cost)
-        return sp + cache[(sr, tr)][0], tp + cache[(sr, tr)][1], '', '', cost + cache[(sr, tr)][2]
-    return wrap
+    Returns:
+    -----------------------------------
+    distances : list
+        Distance of each candidate, or None for those beyond max_distance
+    """
+    m = len(query)
+    if m == 0:
+        return([len(candidate) if max_distance is None or len(candidate) <= max_distance
+                else None for candidate in candidates])
+
+    # Bit i of peq[char] is set if query[i] == char
+    peq = {}
+    for (i, char) in enumerate(query):
+        peq[char] = peq.get(char, 0) | (1 << i)
+    all_ones, high = (1 << m) - 1, 1 << (m - 1)
+
+    distances = []
+    for candidate in candidates:
+        plus, minus, score = all_ones, 0, m
+        remaining = len(candidate)
+        for char in candidate:
+            equal = peq.get(char, 0)
+            vertical = equal | minus
+            horizontal = (((equal & plus) + plus) ^ plus) | equal
+            horizontal_plus = minus | ~(horizontal | plus)
+            horizontal_minus = plus & horizontal
+            if horizontal_plus & high:
+                score += 1
+            elif horizontal_minus & high:
+                score -= 1
+            remaining -= 1
+            # Every remaining character lowers the distance by at most 1
+            if max_distance is not None and score - remaining > max_distance:
+                score = None
+                break
+            horizontal_plus = (horizontal_plus << 1) | 1
+            horizontal_minus = horizontal_minus << 1
+            plus = (horizontal_minus | ~(vertical | horizontal_plus)) & all_ones
+            minus = horizontal_plus & vertical & all_ones
+        if score is not None and max_distance is not None and score > max_distance:
+            score = None
+        distances.append(score)
+    return(distances)
 
 
 def is_prefixed_with(string, prefix):
@@ -153,7 +332,10 @@ def eliminate_prefix(v, u):
 
 def lcs(s1, s2):
     """
-    Returns Iterative longest contiguous sequence. No one character matchings
+    Returns the longest common substring of s1 and s2 (the earliest one in s1
+    among those of the same length), ignoring parentheses. Single characters
+    are matched too. s1 is run through the suffix automaton of s2, giving the
+    longest substring of s2 ending at each character of s1, in linear time.
     Parameters:
     -----------------------------------
     s1, s2 : str
@@ -167,19 +349,130 @@ def lcs(s1, s2):
     """
     s1 = s1.replace('(', '').replace(')', '')
     s2 = s2.replace('(', '').replace(')', '')
-    longest = ""
-    i = 0
-    for x in s1:
-        if re.search(x, s2):
-            s = x
-            while re.search(s, s2):
-                if len(s) > len(longest):
-                    longest = s
-                if i + len(s) == len(s1):
-                    break
-                s = s1[i:i + len(s) + 1]
-        i += 1
-    return longest
+    transitions, links, lengths = suffix_automaton(s2)
+
+    state = matched = longest = end = 0
+    for (i, char) in enumerate(s1):
+        while state and char not in transitions[state]:
+            state = links[state]
+            matched = lengths[state]
+        if char in transitions[state]:
+            state = transitions[state][char]
+            matched += 1
+        if matched > longest:
+            longest, end = matched, i + 1
+    return s1[end - longest:end]
+
+
+def suffix_automaton(s):
+    """
+    Builds the suffix automaton of a string, i.e the smallest automaton
+    accepting all its substrings, in linear time.
+    Parameters:
+    -----------------------------------
+    s : str
+        The string whose substrings to accept
+
+    Returns:
+    -----------------------------------
+    transitions, links, lengths : tuple
+        For every state (0 being the initial one), the dict of its
+        transitions, its suffix link and the length of the longest substring
+        reaching it
+    """
+    transitions, links, lengths = [{}], [-1], [0]
+    last = 0
+    for char in s:
+        current = len(lengths)
+        transitions.append({})
+        links.append(0)
+        lengths.append(lengths[last] + 1)
+        state = last
+        while state != -1 and char not in transitions[state]:
+            transitions[state][char] = current
+            state = links[state]
+        if state != -1:
+            successor = transitions[state][char]
+            if lengths[state] + 1 == lengths[successor]:
+                links[current] = successor
+            else:
+                clone = len(lengths)
+                transitions.append(dict(transitions[successor]))
+                links.append(links[successor])
+                lengths.append(lengths[state] + 1)
+                while state != -1 and transitions[state].get(char) == successor:
+                    transitions[state][char] = clone
+                    state = links[state]
+                links[successor] = links[current] = clone
+        last = current
+    return((transitions, links, lengths))
+
+
+class InflectionPlan(object):
+    """
+    The operations inflecting a word ('delete_<suffix>' / 'insert_<suffix>'
+    attributes), compiled once so that they can be applied to many words.
+    As inflect has always done, the operations are applied in sorted order,
+    that is the deletions first and then the insertions.
+
+    Plans are immutable and hashable, two plans being equal when their
+    operations are, so they can be cached and compared.
+    """
+
+    __slots__ = ('operations', 'deletions', 'insertion')
+
+    def __init__(self, operations):
+        """
+        Parameters:
+        -----------------------------------
+        operations : iterable
+            Operations to be applied to the input words to inflect them
+        """
+        operations = tuple(sorted(operations))
+        deletions, insertions = [], []
+        for operation in operations:
+            method, chunk = operation.split('_', 1)
+            if method == 'delete':
+                deletions.append(chunk)
+            else:
+                insertions.append(chunk)
+        object.__setattr__(self, 'operations', operations)
+        object.__setattr__(self, 'deletions', tuple(deletions))
+        object.__setattr__(self, 'insertion', ''.join(insertions))
+
+    def apply(self, word):
+        """
+        Inflects a word: each deletion removes its suffix if the word ends
+        with it, and the insertions are then appended
+        Parameters:
+        -----------------------------------
+        word : str
+            The word to be inflected
+
+        Returns:
+        -----------------------------------
+        word : str
+            Inflected word
+        """
+        for suffix in self.deletions:
+            if word.endswith(suffix):
+                word = word[:len(word) - len(suffix)]
+        return(word + self.insertion)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("InflectionPlan is immutable")
+
+    def __eq__(self, other):
+        return(isinstance(other, InflectionPlan) and self.operations == other.operations)
+
+    def __hash__(self):
+        return(hash(self.operations))
+
+    def __len__(self):
+        return(len(self.operations))
+
+    def __repr__(self):
+        return("InflectionPlan({})".format(list(self.operations)))
 
 
 def inflect(word, operations):
@@ -197,13 +490,7 @@ def inflect(word, operations):
     word : str
         Inflected word
     """
-    for operation in sorted(operations):
-        method, chunk = operation.split('_')
-        if method == 'delete':
-            word = word.rstrip(chunk)
-        else:
-            word = word + chunk
-    return word
+    return(InflectionPlan(operations).apply(word))
 
 
 def get_io_chunks(s1, s2):
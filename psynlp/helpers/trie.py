@@ -0,0 +1,100 @@
+from array import array
+
+# Marks a trie node that doesn't end any word
+NO_WORD = -1
+
+
+class WordTrie(object):
+    """
+    A character trie of a list of words, searched for the word closest to a
+    query in Levenshtein distance (unit costs). The search keeps one row of
+    the edit-distance table per trie depth, so words sharing a prefix share
+    its rows, and prunes the subtrees that can't beat the best word found.
+    """
+
+    def __init__(self, words):
+        """
+        Parameters:
+        -----------------------------------
+        words : list[str]
+            The words to search in. Their indices in the list are returned,
+            and ties are broken in favour of the lowest index.
+        """
+        self.alphabet = set()
+        self._children = [{}]
+        self._word = array('i', [NO_WORD])
+        # lowest word index in the subtree of each node
+        self._min_index = array('i', [len(words)])
+
+        for (index, word) in enumerate(words):
+            self.alphabet.update(word)
+            node = 0
+            for char in word:
+                if self._min_index[node] > index:
+                    self._min_index[node] = index
+                child = self._children[node].get(char)
+                if child is None:
+                    child = self._children[node][char] = len(self._children)
+                    self._children.append({})
+                    self._word.append(NO_WORD)
+                    self._min_index.append(index)
+                node = child
+            if self._min_index[node] > index:
+                self._min_index[node] = index
+            if self._word[node] == NO_WORD:
+                self._word[node] = index
+
+    def nearest(self, query, max_distance):
+        """
+        Finds the word at the least edit distance from the query, among the
+        ones closer than max_distance.
+        Parameters:
+        -----------------------------------
+        query : str
+            The word to be matched
+        max_distance : int
+            Only words at a distance strictly lower than this are considered
+
+        Returns:
+        -----------------------------------
+        distance, index : tuple
+            The least distance and the lowest index of a word at that distance,
+            or (max_distance, -1) if no word is close enough
+        """
+        best_distance, best_index = max_distance, NO_WORD
+        children, word, min_index = self._children, self._word, self._min_index
+        columns = range(1, len(query) + 1)
+
+        # (node, depth, row, least value in the row), the child following
+        # the query being pushed last so that it is explored first
+        stack = [(0, 0, list(range(len(query) + 1)), 0)]
+        while stack:
+            node, depth, row, lowest = stack.pop()
+            if lowest > best_distance or (
+                    lowest == best_distance and min_index[node] > best_index):
+                continue
+            index = word[node]
+            if index != NO_WORD and (row[-1] < best_distance or (
+                    row[-1] == best_distance and index < best_index)):
+                best_distance, best_index = row[-1], index
+
+            next_char = query[depth] if depth < len(query) else None
+            following = None
+            for (char, child) in children[node].items():
+                child_row = [row[0] + 1]
+                for column in columns:
+                    child_row.append(min(
+                        child_row[column - 1] + 1,
+                        row[column] + 1,
+                        row[column - 1] + (query[column - 1] != char)))
+                lowest = min(child_row)
+                if lowest < best_distance or (
+                        lowest == best_distance and min_index[child] < best_index):
+                    if char == next_char:
+                        following = (child, depth + 1, child_row, lowest)
+                    else:
+                        stack.append((child, depth + 1, child_row, lowest))
+            if following is not None:
+                stack.append(following)
+
+        return((best_distance, best_index))
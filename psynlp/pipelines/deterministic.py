@@ -3,9 +3,9 @@ Pipelines for SIGMORPHON-2017 task of Universal Morphological Inflection.
 """
 
 import pandas as pd
-from ..core.ostia import OSTIA
+from ..core import clusters
 from ..helpers.importers import init_concept_from_wordpairs, fetch_testing_data, parse_metadata_words, parse_metadata_fca
-from ..helpers.text import inflect
+from ..helpers.text import InflectionPlan
 
 
 def fetch_accuracy(language='english', quality='high'):
@@ -13,9 +13,10 @@ def fetch_accuracy(language='english', quality='high'):
         language=language, quality=quality), 'deterministic')
     testing_data = fetch_testing_data(language=language)
     total = correct = 0
+    # Operations of each (metadata, cluster), compiled once
+    plans = {}
 
     for (source, metadata, expected_dest) in testing_data:
-        scores = []
         if metadata not in pac:
             if source == expected_dest:
                 correct += 1
@@ -29,30 +30,20 @@ def fetch_accuracy(language='english', quality='high'):
             total += 1
             continue
 
-        for (antecedent_attrs, consequent_attrs) in cluster:
-            ostia = OSTIA(consequent_attrs)
-            scores.append((consequent_attrs, ostia.matches_any_path(source)))
+        # Models of the clusters are trained once, and shared across calls
+        cluster_index = clusters.models.cluster_index(metadata, cluster)
 
-        scores = sorted(scores, key=lambda x: x[1][0])
-        cluster_words, (min_score, closest_word) = scores[0]
-        just_scores = [s[0] for _, s in scores]
+        min_score, matches = cluster_index.closest(source)
+        for (position, _) in matches:
+            if (metadata, position) not in plans:
+                _, cluster_words = cluster_index.clusters[position]
+                plans[(metadata, position)] = InflectionPlan(
+                    concept.objects_intent(set(cluster_words)))
 
-        if just_scores.count(min_score) == 1:
-            operations = concept.objects_intent(set(cluster_words))
-        else:
-            max_operations = 0
-            index_of_min_score = 0
-            for i, s in enumerate(scores[0:just_scores.count(min_score)]):
-                this_cluster, (score, _) = s
-                operations = concept.objects_intent(set(this_cluster))
-                if len(operations) > max_operations:
-                    max_operations = len(operations)
-                    cluster_words = this_cluster
-                    index_of_min_score = i
-            closest_word = scores[index_of_min_score][1][1]
-            operations = concept.objects_intent(set(cluster_words))
-
-        computed_dest = inflect(source, operations)
+        # Among tied clusters, the first one with the most operations
+        position, closest_word = max(
+            matches, key=lambda match: len(plans[(metadata, match[0])]))
+        computed_dest = plans[(metadata, position)].apply(source)
 
         if computed_dest == expected_dest:
             correct += 1
@@ -2,14 +2,51 @@
 Pipelines for SIGMORPHON-2017 task of Universal Morphological Inflection.
 """
 
+import os
 from ..core.ostia import OSTIA
-from ..helpers.importers import fetch_input_output_pairs, fetch_testing_data
-from ..helpers.text import levenshtein
+from ..helpers.importers import fetch_input_output_pairs, fetch_testing_data, training_filepath
+from ..helpers.text import levenshtein_many
 
 
-def fetch_accuracy(language='english', quality='high'):
-    model = fetch_input_output_pairs(language=language, quality=quality)
-    model = OSTIA(model)
+def fetch_model(language='english', quality='high', model_dir=None):
+    """
+    Trains OSTIA for a language, or loads it from model_dir if a model that
+    is up-to-date with the training data has been saved there.
+    Parameters:
+    -----------------------------------
+    language : str
+        Name of the language
+    quality : str
+        size of the dataset to consider
+    model_dir : str
+        Directory where trained models are saved (Default: None, always
+        retrain)
+
+    Returns:
+    -----------------------------------
+    model : OSTIA
+        The trained model
+    """
+    if model_dir is None:
+        return(OSTIA(fetch_input_output_pairs(language=language, quality=quality)))
+
+    training_file = training_filepath(language, quality)
+    model_path = os.path.join(model_dir, "{}-{}.ostia".format(language, quality))
+    try:
+        model = OSTIA.load(model_path, training_file)
+        verbose_print_1("Loaded OSTIA from {}".format(model_path))
+        return(model)
+    except (OSError, ValueError) as error:
+        verbose_print_1("Retraining OSTIA: {}".format(error))
+
+    model = OSTIA(fetch_input_output_pairs(language=language, quality=quality))
+    os.makedirs(model_dir, exist_ok=True)
+    model.save(model_path, training_file)
+    return(model)
+
+
+def fetch_accuracy(language='english', quality='high', model_dir=None):
+    model = fetch_model(language=language, quality=quality, model_dir=model_dir)
 
     correct = total = 0
     levenshteinDist = {}
@@ -26,7 +63,7 @@ def fetch_accuracy(language='english', quality='high'):
                                                              metadatas, predicted_dest))
             correct += 1
         else:
-            dist = levenshtein(expected_dest, predicted_dest)[2]
+            dist = levenshtein_many(expected_dest, [predicted_dest])[0]
             if dist in levenshteinDist:
                 levenshteinDist[dist] += 1
             else:
@@ -2,20 +2,20 @@
 Pipelines for SIGMORPHON-2017 task of Universal Morphological Inflection.
 """
 
-import operator
-from ..core.ostia import OSTIA
+from ..core import clusters
 from ..helpers.importers import parse_metadata_fca, parse_metadata_words, fetch_testing_data
-from ..helpers.text import inflect
+from ..helpers.text import InflectionPlan
 
 
-def fetch_accuracy(language='english', quality='high'):
+def fetch_accuracy(language='english', quality='high', basis='pac'):
     pac = parse_metadata_fca(parse_metadata_words(
-        language=language, quality=quality), 'pac')
+        language=language, quality=quality), basis)
     testing_data = fetch_testing_data(language=language)
     total = correct = 0
+    # Operations of each (metadata, cluster), compiled once
+    plans = {}
 
     for (source, metadata, expected_dest) in testing_data:
-        scores = []
         if metadata not in pac:
             if source == expected_dest:
                 correct += 1
@@ -27,16 +27,17 @@ def fetch_accuracy(language='english', quality='high'):
                 correct += 1
             total += 1
             continue
-        for (antecedent_attrs, consequent_attrs) in cluster:
-            ostia = OSTIA(consequent_attrs)
-            scores.append(ostia.matches_any_path(source))
+        # Models of the clusters are trained once, and shared across calls
+        cluster_index = clusters.models.cluster_index(metadata, cluster)
 
-        min_score, score_tup = sorted(scores, key=operator.itemgetter(0))[0]
-        just_scores = [s for s, _ in scores]
-        index_of_min_score = just_scores.index(min_score)
-        _, cluster_words = list(cluster)[index_of_min_score]
-        operations = concept.objects_intent(set(cluster_words))
-        computed_dest = inflect(source, operations)
+        min_score, matches = cluster_index.closest(source)
+        position, score_tup = matches[0]
+        plan = plans.get((metadata, position))
+        if plan is None:
+            _, cluster_words = cluster_index.clusters[position]
+            plan = plans[(metadata, position)] = InflectionPlan(
+                concept.objects_intent(set(cluster_words)))
+        computed_dest = plan.apply(source)
         if computed_dest == expected_dest:
             correct += 1
             verbose_print_1("{} + {}: Expected and found {}".format(source,
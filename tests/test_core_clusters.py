@@ -0,0 +1,44 @@
+from ..psynlp.core.clusters import ClusterIndex, ModelCache
+from ..psynlp.core.ostia import OSTIA
+from ..psynlp.helpers import builtins
+from ..psynlp.helpers.importers import init_concept_from_wordpairs, parse_metadata_words, fetch_testing_data
+from ..psynlp.helpers.misc import deterministic_pac
+builtins.init_verbose(1)
+
+
+def test_closest():
+    """
+    Tests that the cluster index finds the clusters that score the best when
+    matching an OSTIA of each cluster
+    """
+    metadata_words = parse_metadata_words(language='english', quality='low')
+    metadata = max(metadata_words, key=lambda metadata: len(metadata_words[metadata]))
+    cluster = deterministic_pac(init_concept_from_wordpairs(metadata_words[metadata]))
+    cluster_index = ClusterIndex(cluster)
+
+    for (source, _, _) in fetch_testing_data(language='english')[:20]:
+        scores = [OSTIA(cluster_words).matches_any_path(source)
+                  for (_, cluster_words) in cluster]
+        min_score = min(score for (score, _) in scores)
+        assert cluster_index.closest(source) == \
+            (min_score, [(position, closest_word)
+                         for (position, (score, closest_word)) in enumerate(scores)
+                         if score == min_score])
+
+
+def test_model_cache():
+    """
+    Tests that the index of a cluster object is built once, and that the
+    models of equal clusters are shared between their indexes
+    """
+    metadata_words = parse_metadata_words(language='english', quality='low')
+    metadata = max(metadata_words, key=lambda metadata: len(metadata_words[metadata]))
+    cluster = deterministic_pac(init_concept_from_wordpairs(metadata_words[metadata]))
+    cache = ModelCache()
+
+    cluster_index = cache.cluster_index(metadata, cluster)
+    assert cache.cluster_index(metadata, cluster) is cluster_index
+    equal_index = cache.cluster_index(metadata, list(cluster))
+    assert equal_index is not cluster_index
+    assert all(model is equal_model for (model, equal_model)
+               in zip(cluster_index.models, equal_index.models))
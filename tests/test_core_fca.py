@@ -0,0 +1,168 @@
+import itertools
+from ..psynlp.core.fca import FCA, Hypothesis
+from ..psynlp.helpers import builtins
+from ..psynlp.helpers.importers import init_concept_from_wordpairs, parse_metadata_words
+builtins.init_verbose(1)
+
+
+def test_bitsets():
+    """
+    Tests that intents, extents and closures computed on the bitmasks are
+    the ones computed on the neighbours in the graph
+    """
+    def shared(concept, names):
+        return(set.intersection(*[set(concept[name]) for name in names]))
+
+    metadata_words = parse_metadata_words(language='english', quality='low')
+    metadata = max(metadata_words, key=lambda metadata: len(metadata_words[metadata]))
+    concept = init_concept_from_wordpairs(metadata_words[metadata])
+    objects, attributes = concept.objects(), concept.attributes()
+
+    for names in itertools.chain(itertools.combinations(objects, 2),
+                                 itertools.combinations(attributes[:12], 3)):
+        assert concept.objects_intent(names) == shared(concept, names)
+        assert concept.attributes_extent(names) == shared(concept, names)
+        if shared(concept, names):
+            closure = shared(concept, shared(concept, names))
+            assert concept.attributes_superset(names) == closure
+            assert concept.objects_superset(names) == closure
+        else:
+            assert concept.attributes_superset(names) == attributes
+            assert concept.objects_superset(names) == objects
+
+    assert concept.objects_intent([]) == attributes
+    assert concept.attributes_extent([]) == objects
+    assert concept.objects_intent([objects[0], attributes[0]]) == set()
+
+    concept = FCA()
+    concept.add_relations([('insert_s', 'walk'), ('insert_s', 'talk')])
+    assert concept.attributes_superset(['walk']) == {'walk', 'talk'}
+    concept.add_relation('insert_ed', 'walk')
+    assert concept.attributes_superset(['walk']) == {'walk'}
+    assert concept.objects_superset(['insert_ed']) == {'insert_ed', 'insert_s'}
+    try:
+        concept.objects_intent(['run'])
+        assert False, "Unknown name was not detected"
+    except KeyError:
+        pass
+
+
+def test_closure_cache():
+    """
+    Tests that closures are reused until a relation is added
+    """
+    concept = FCA()
+    concept.add_relations([('insert_s', 'walk'), ('insert_s', 'talk'),
+                           ('insert_ed', 'walk')])
+    assert concept.attributes_superset(['talk']) == {'walk', 'talk'}
+    assert concept.attributes_superset({'talk'}) == {'walk', 'talk'}
+    assert concept.closures.hits == 1
+
+    mask = concept.attribute_rows.mask(['talk'])
+    assert concept.closure_mask(mask, concept.attribute_rows) == \
+        concept.attribute_rows.mask(['walk', 'talk'])
+    assert concept.closures.hits == 2
+
+    concept.add_relation('insert_ed', 'walk')
+    assert len(concept.closures) == 1
+    concept.add_relation('insert_ed', 'talk')
+    assert len(concept.closures) == 0
+    assert concept.attributes_superset(['talk']) == {'walk', 'talk'}
+    assert concept.objects_superset(['insert_s']) == {'insert_s', 'insert_ed'}
+
+
+def test_concepts():
+    """
+    Tests that NextClosure enumerates every concept exactly once, and that
+    the intents and the models of implications follow from it
+    """
+    metadata_words = parse_metadata_words(language='english', quality='low')
+    metadata = max(metadata_words, key=lambda metadata: len(metadata_words[metadata]))
+    concept = init_concept_from_wordpairs(metadata_words[metadata])
+    objects = concept.objects()
+
+    expected = set()
+    for size in range(len(objects) + 1):
+        for object_names in itertools.combinations(objects, size):
+            extent = frozenset(concept.objects_superset(object_names))
+            expected.add((extent, frozenset(concept.objects_intent(extent))))
+    concepts = [(frozenset(extent), frozenset(intent))
+                for (extent, intent) in concept.concepts()]
+    assert len(concepts) == len(expected)
+    assert set(concepts) == expected
+    assert concept.set_of_intents() == \
+        set(tuple(sorted(intent)) for (_, intent) in expected)
+
+    concept = FCA()
+    concept.add_relations([('insert_s', 'walk'), ('insert_s', 'talk'),
+                           ('insert_ed', 'walk')])
+    assert concept.models([(('walk',), ('talk',))]) == {(), ('talk',), ('talk', 'walk')}
+    assert concept.is_basis([((), ('walk',)), (('talk',), ('walk',))])
+    assert not concept.is_basis([(('walk',), ('talk',))])
+    assert concept.enumerateConcepts() == {
+        0: {'intent': {'talk', 'walk'}, 'extent': ('insert_s',)},
+        1: {'intent': {'walk'}, 'extent': ('insert_ed', 'insert_s')}}
+
+
+def test_canonical_basis():
+    """
+    Tests that the canonical basis has one implication for each pseudo-intent,
+    found by brute force, and that the intents are exactly its models
+    """
+    metadata_words = parse_metadata_words(language='english', quality='low')
+    metadata = min(metadata_words, key=lambda metadata: len(metadata_words[metadata]))
+    # The first words of the smallest group, few enough for the brute force
+    concept = init_concept_from_wordpairs(metadata_words[metadata][:8])
+    attributes = concept.attributes()
+
+    def closure(names):
+        return(set(concept.attributes_superset(names)))
+
+    pseudo_intents = []
+    for size in range(len(attributes) + 1):
+        for names in itertools.combinations(attributes, size):
+            names = set(names)
+            if closure(names) != names and all(
+                    closure(pseudo_intent) <= names
+                    for pseudo_intent in pseudo_intents if pseudo_intent < names):
+                pseudo_intents.append(names)
+    basis = concept.canonical_basis()
+    assert basis == set((tuple(sorted(pseudo_intent)),
+                         tuple(sorted(closure(pseudo_intent))))
+                        for pseudo_intent in pseudo_intents)
+    assert concept.is_basis(basis)
+
+
+def test_hypothesis():
+    """
+    Tests that a hypothesis answers model checks and closures as its
+    implications do one by one, while horn1 updates it
+    """
+    concept = FCA()
+    concept.add_relations([('insert_s', 'walk'), ('insert_s', 'talk'),
+                           ('insert_ed', 'walk'), ('insert_ing', 'run')])
+    walk_talk = (('walk',), ('talk', 'walk'))
+    H = Hypothesis(concept.attribute_rows, [walk_talk, ((), ('run',))])
+    assert len(H) == 2 and walk_talk in H
+
+    def check_models():
+        for size in range(4):
+            for names in itertools.combinations(['run', 'talk', 'walk'], size):
+                assert H.is_model(names) == \
+                    concept.is_model_of_implications(names, set(H))
+                assert concept.implications_not_respecting_attributes(names, H) == \
+                    concept.implications_not_respecting_attributes(names, set(H))
+
+    check_models()
+    assert H.closure(['walk']) == {'run', 'talk', 'walk'}
+
+    H.restrict({walk_talk}, {'walk', 'run'})
+    assert set(H) == {(('walk',), ('walk',)), ((), ('run',))}
+    assert H.closure(['walk']) == {'run', 'walk'}
+    H.discard(((), ('run',)))
+    H.add((('talk',), ('run', 'talk')))
+    assert H.closure(['walk']) == {'walk'}
+    assert H.closure(['talk']) == {'run', 'talk'}
+    check_models()
+    assert concept.find_not_members(H, {'walk', 'run'}, lambda *args: False) == \
+        (('talk',), ('run', 'talk'))
@@ -0,0 +1,158 @@
+from ..psynlp.core.fst import FST
+from ..psynlp.core.ostia import OSTIA
+from ..psynlp.helpers import builtins
+from ..psynlp.helpers.importers import fetch_input_output_pairs
+builtins.init_verbose(1)
+
+
+def snapshot(graph):
+    return((graph.states(), graph.arcs(), graph.first_state(),
+            graph.last_state(), graph.new_state(),
+            [graph.out_arcs(state) for state in graph.states()],
+            [graph.in_arcs(state) for state in graph.states()],
+            [graph.state_metadatas(state) for state in graph.states()]))
+
+
+def test_rollback():
+    """
+    Tests that rolling back merges and push-backs restores the transducer
+    """
+    ostia = OSTIA(fetch_input_output_pairs(language='english', quality='low'))
+    graph = ostia.graph
+    before = snapshot(graph)
+
+    savepoint = graph.begin()
+    states = graph.states()
+    for (a, b) in zip(states[1:200:2], states[2:200:2]):
+        ostia.merge(a, b)
+    for (to_state, input, output) in graph.out_arcs(states[1]):
+        ostia.push_back(output[-1:], (states[1], input, output, to_state))
+    graph.add_arc(graph.add_state(), 'x', 'y', -1)
+    graph.link_metadata('V', graph.new_state() - 1)
+    assert snapshot(graph) != before
+
+    graph.rollback(savepoint)
+    graph.commit()
+    assert snapshot(graph) == before
+    assert [ostia.fit_closest_path(word, ['V']) for word in ('walk', 'sing')] == \
+        [OSTIA(fetch_input_output_pairs(language='english', quality='low'))
+         .fit_closest_path(word, ['V']) for word in ('walk', 'sing')]
+
+
+def test_transduce():
+    """
+    Tests the compiled transduction: arcs with an empty input, ambiguous and
+    missing transitions, and the output of the end marker being dropped
+    """
+    graph = FST()
+    graph.add_arc(0, 'w', 'w', 1)
+    graph.add_arc(1, 'a', 'a', 2)
+    graph.add_arc(2, '', 'l', 3)
+    graph.add_arc(3, 'k', 'ked', 4)
+    graph.add_arc(4, '#', 'S', -1)
+    compiled = graph.compile()
+    assert compiled.transduce('wak', 0, -1, '#') == 'walked'
+    assert compiled.transduce('wak#', 0, -1) == 'walkedS'
+    # Missing transition, word left unfinished, and extra input
+    assert compiled.transduce('wok', 0, -1, '#') is None
+    assert compiled.transduce('wa', 0, -1, '#') is None
+    assert compiled.transduce('wakk', 0, -1, '#') is None
+
+    # An empty input next to an arc for the next symbol is ambiguous
+    graph.add_arc(2, 'k', 'k', 4)
+    assert graph.compile().transduce('wak', 0, -1, '#') is None
+
+    graph = FST()
+    graph.add_arc(0, 'a', 'x', 1)
+    graph.add_arc(0, 'a', 'y', 2)
+    graph.add_arc(0, 'b', 'z', 3)
+    for state in (1, 2, 3):
+        graph.add_arc(state, '#', '', -1)
+    compiled = graph.compile()
+    assert compiled._row(graph._slot(0))[graph.symbols.id('a')] is compiled.AMBIGUOUS
+    assert compiled.transduce('a', 0, -1, '#') is None
+    assert compiled.transduce('b', 0, -1, '#') == 'z'
+    # Within a context leaving one of the arcs out, it is no longer ambiguous
+    graph.add_metadata('V')
+    for state in (0, 1, -1):
+        graph.link_metadata('V', state)
+    assert graph.contextual_subgraph(['V']).compile().transduce('a', 0, -1, '#') == 'x'
+
+
+def test_journal():
+    """
+    Tests that a merge kept by OSTIA is committed, so that the journal of the
+    next attempt starts empty and rolling it back keeps the kept merge
+    """
+    ostia = OSTIA(fetch_input_output_pairs(language='english', quality='low'))
+    graph = ostia.graph
+    assert graph._journal is None
+    states = graph.states()
+
+    graph.begin()
+    ostia.merge(states[1], states[2])
+    graph.commit()
+    kept = snapshot(graph)
+
+    savepoint = graph.begin()
+    assert savepoint == 0 and graph._journal == []
+    ostia.merge(states[1], states[3])
+    graph.rollback(savepoint)
+    assert snapshot(graph) == kept
+    graph.commit()
+
+
+def test_rollback_without_journal():
+    """
+    Tests that rolling back with no mutations being logged, before begin or
+    after commit, undoes nothing
+    """
+    graph = FST()
+    graph.rollback()
+    assert graph._journal is None
+
+    state = graph.add_state()
+    graph.add_arc(0, 'a', 'b', state)
+    before = snapshot(graph)
+    savepoint = graph.begin()
+    graph.add_arc(state, 'c', 'd', -1)
+    graph.commit()
+    after = snapshot(graph)
+    assert after != before
+    graph.rollback(savepoint)
+    assert snapshot(graph) == after and graph._journal is None
+
+
+def test_metadata_links(tmp_path):
+    """
+    Tests that a metadata is linked to a state only once, and that the
+    metadatas of a state follow links, rollbacks and a save / load
+    """
+    graph = FST()
+    state = graph.add_state()
+    graph.add_arc(state, 'a', 'b', -1)
+    graph.link_metadata('V', state)
+    graph.link_metadata('PST', state)
+    graph.link_metadata('V', -1)
+    graph.link_metadata('V', state)
+    assert len(graph._tag_slots[graph.tags.id('V')]) == 2
+    assert graph.state_metadatas(state) == ['V', 'PST']
+    assert graph.state_metadatas(0) == []
+
+    savepoint = graph.begin()
+    graph.link_metadata('NFIN', state)
+    graph.link_metadata('PST', -1)
+    assert graph.state_metadatas(state) == ['V', 'PST', 'NFIN']
+    graph.rollback(savepoint)
+    graph.commit()
+    assert graph.state_metadatas(state) == ['V', 'PST']
+    assert graph.state_metadatas(-1) == ['V']
+
+    path = str(tmp_path / 'links.fst')
+    graph.save(path)
+    loaded = FST.load(path)
+    assert [loaded.state_metadatas(state) for state in (0, state, -1)] == \
+        [[], ['V', 'PST'], ['V']]
+    loaded.link_metadata('PST', state)
+    loaded.link_metadata('PST', -1)
+    assert loaded.state_metadatas(-1) == ['V', 'PST']
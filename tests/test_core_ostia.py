@@ -0,0 +1,119 @@
+from ..psynlp.core.ostia import OSTIA
+from ..psynlp.helpers import builtins
+from ..psynlp.helpers.text import align, levenshtein
+from ..psynlp.helpers.importers import fetch_input_output_pairs, fetch_testing_data, training_filepath
+builtins.init_verbose(1)
+
+
+def test_save_load(tmp_path):
+    """
+    Tests that a saved OSTIA loads back to the same transducer, and that a
+    model is detected as stale against other training data
+    """
+    model = OSTIA(fetch_input_output_pairs(language='english', quality='low'))
+    model_path = str(tmp_path / 'english-low.ostia')
+    model.save(model_path, training_filepath('english', 'low'))
+
+    loaded = OSTIA.load(model_path, training_filepath('english', 'low'))
+    assert loaded.graph.states() == model.graph.states()
+    assert loaded.graph.arcs() == model.graph.arcs()
+    assert loaded.graph.metadatas() == model.graph.metadatas()
+    assert loaded.subseq()
+    assert list(OSTIA.load(model_path).graph.touched_states()) == \
+        list(model.graph.touched_states())
+    for (source, metadata, _) in fetch_testing_data(language='english')[:20]:
+        metadatas = metadata.split(';')
+        assert loaded.fit_closest_path(source, metadatas) == \
+            model.fit_closest_path(source, metadatas)
+
+    try:
+        OSTIA.load(model_path, training_filepath('english', 'medium'))
+        assert False, "Stale model was not detected"
+    except ValueError:
+        pass
+
+
+def test_subseq_violation():
+    """
+    Tests that checking only the touched states finds the same violation as
+    a scan of the whole transducer, across merges and rollbacks
+    """
+    def first_violation(graph):
+        for state in graph.states():
+            arcs = graph.out_arcs(state)
+            for (neighbor_1, input_1, output_1) in arcs:
+                for (neighbor_2, input_2, output_2) in arcs:
+                    if neighbor_1 != neighbor_2 and \
+                            (input_1, output_1) == (input_2, output_2):
+                        return((state, input_1, output_1, neighbor_1, output_2, neighbor_2))
+
+    model = OSTIA(fetch_input_output_pairs(language='english', quality='low'))
+    graph = model.graph
+    assert model.subseq()
+    states = graph.states()
+    for (a, b) in zip(states[1:300:3], states[3:300:3]):
+        savepoint = graph.begin()
+        model.merge(a, b)
+        assert model.find_subseq_violation() == first_violation(graph)
+        if a % 2:
+            graph.rollback(savepoint)
+            assert model.find_subseq_violation() == first_violation(graph)
+    graph.commit()
+
+
+def test_closest_path():
+    """
+    Tests that both the scan of the path words and the trie search find the
+    same path as scoring every path word with the aligned edit distance
+    """
+    model = OSTIA(fetch_input_output_pairs(language='english', quality='low'))
+    scanned = OSTIA(fetch_input_output_pairs(language='english', quality='low'))
+    # Small contexts are scanned, so the trie is only searched without a limit
+    model.scan_limit = 0
+    for (source, metadata, _) in fetch_testing_data(language='english')[:10]:
+        path_index = model.graph.contextual_subgraph(metadata.split(';')).path_index()
+        min_ldist, closest_index = len(source), -1
+        for i, word in enumerate(path_index.words):
+            lp, lr, ls, rp, rr, rs = align(word, source)
+            score = levenshtein(lp, rp)[-1] + levenshtein(ls, rs)[-1] + levenshtein(lr, rr)[-1]
+            score = float(score) / len(source)
+            if score < min_ldist:
+                min_ldist, closest_index = score, i
+        assert model.closest_path(path_index, source) == (min_ldist, closest_index)
+        assert scanned.closest_path(path_index, source) == (min_ldist, closest_index)
+
+
+def test_contextual_paths():
+    """
+    Tests that the paths of a context in the prefix tree are only the words
+    trained under that context, even when a longer word of another context
+    goes through the state a word ends at
+    """
+    T = fetch_input_output_pairs(language='english', quality='low')
+    graph = OSTIA.__new__(OSTIA).form_io_digraph(T)
+    for metadatas in set(tuple(metadatas) for (_, metadatas, _) in T):
+        words = set(source + '#' for (source, pair_metadatas, _) in T
+                    if set(metadatas) <= set(pair_metadatas))
+        assert set(graph.contextual_subgraph(metadatas).path_index().words) == words
+
+    model = OSTIA([('walk', ['N', 'SG'], 'walk'), ('walker', ['N', 'PL'], 'walkers')])
+    assert model.graph.contextual_subgraph(['N', 'PL']).path_index().words == ['walker#']
+    assert model.graph.contextual_subgraph(['N', 'SG']).path_index().words == ['walk#']
+
+
+def test_transduce():
+    """
+    Tests that the training words are transduced to their forms in their
+    contexts, and that words the transducer doesn't cover fall back to the
+    closest path
+    """
+    T = fetch_input_output_pairs(language='english', quality='low')
+    model = OSTIA(T)
+    for (source, metadatas, dest) in T:
+        assert model.transduce(source, metadatas) == dest
+        assert model.fit_closest_path(source, metadatas) == (dest, source + '#')
+
+    assert model.transduce('zzzq', ['V']) is None
+    prediction, closest_word = model.fit_closest_path('zzzq', ['V'])
+    assert closest_word != 'zzzq#'
+    assert closest_word in model.graph.contextual_subgraph(['V']).path_index().words
@@ -0,0 +1,27 @@
+from ..psynlp.helpers import builtins
+from ..psynlp.helpers.alignments import AlignmentTable, read_pairs
+from ..psynlp.helpers.importers import training_filepath
+from ..psynlp.helpers.text import get_io_chunks, iterLCS
+builtins.init_verbose(1)
+
+
+def test_cache(tmp_path):
+    """
+    Tests that the alignments of a training file are the ones computed pair
+    by pair, both when aligned in a pool and when loaded from the cache
+    """
+    filepath = training_filepath('english', 'high')
+    cache_dir = str(tmp_path / 'alignments')
+    AlignmentTable(cache_dir, processes=2).load(filepath)
+
+    assert len(list((tmp_path / 'alignments').iterdir())) == 1
+
+    table = AlignmentTable(cache_dir)
+    table.load(filepath)
+    pairs = read_pairs(filepath)
+    assert len(table) == len(set(pairs))
+    for (source, dest) in pairs:
+        assert table.chunks(source, dest) == get_io_chunks(source, dest)
+        mutations = iterLCS({'source': source, 'target': dest})
+        assert table.mutations(source, dest) == \
+            {'added': mutations['added'], 'deleted': mutations['deleted']}
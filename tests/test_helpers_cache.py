@@ -0,0 +1,32 @@
+from ..psynlp.helpers.cache import LRUCache
+from ..psynlp.helpers.text import alignment_cache, levenshtein
+
+
+def test_stats():
+    """
+    Tests that the cache counts its hits, misses and evictions, and evicts the
+    least recently used entries
+    """
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert 'a' in cache and 'c' in cache
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'evictions': 1,
+                             'size': 2, 'maxsize': 2}
+
+    cache.maxsize = 1
+    cache.put('d', 4)
+    assert cache.stats()['evictions'] == 3 and len(cache) == 1
+
+
+def test_alignment_cache():
+    """
+    Tests that levenshtein results are cached per pair and costs
+    """
+    hits = alignment_cache.hits
+    assert levenshtein('kitten', 'sitting') == levenshtein('kitten', 'sitting')
+    assert alignment_cache.hits == hits + 1
+    assert levenshtein('kitten', 'sitting', substcost=2.0)[-1] == 5.0
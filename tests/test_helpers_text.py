@@ -0,0 +1,151 @@
+import random
+from ..psynlp.helpers import builtins
+from ..psynlp.helpers.importers import fetch_input_output_pairs
+from ..psynlp.helpers.text import InflectionPlan, inflect, iterLCS, lcs, levenshtein
+from ..psynlp.helpers.text import edit_distance, levenshtein_bounded, levenshtein_many
+builtins.init_verbose(1)
+
+
+def test_inflection_plan():
+    """
+    Tests that a plan deletes exact suffixes before appending the insertions,
+    whatever the order of the operations, and that equal plans hash alike
+    """
+    plan = InflectionPlan(['insert_ed', 'delete_e'])
+    assert plan.apply('bake') == 'baked'
+    # Only the suffix 'e' is deleted, not every trailing 'e'
+    assert plan.apply('agree') == 'agreed'
+    # A suffix the word doesn't end with is left alone
+    assert plan.apply('walk') == 'walked'
+    assert InflectionPlan(['insert_a_b']).apply('x') == 'xa_b'
+
+    assert plan == InflectionPlan({'delete_e', 'insert_ed'})
+    assert len({plan, InflectionPlan(['delete_e', 'insert_ed'])}) == 1
+    assert len(plan) == 2
+    assert inflect('bake', {'delete_e', 'insert_ed'}) == 'baked'
+    try:
+        plan.insertion = 's'
+        assert False, "Plan was modified"
+    except AttributeError:
+        pass
+
+
+def test_levenshtein():
+    """
+    Tests the alignments and costs of levenshtein, under non-unit costs (the
+    characters left over once a string is exhausted costing 1 each), its
+    tie-breaking and words too long for the former recursive implementation
+    """
+    assert levenshtein('kitten', 'sitting') == ('kitten_', 'sitting', 3.0)
+    assert levenshtein('kitten', 'sitting', 2.0, 1.0, 3.0) == ('kitten_', 'sitting', 7.0)
+    assert levenshtein('sing', 'sang', substcost=2.5) == ('s_ing', 'sa_ng', 2.0)
+    assert levenshtein('flaw', 'lawn', substcost=2.0) == ('flaw_', '_lawn', 2.0)
+    assert levenshtein('walk', 'walked', inscost=0.5) == ('walk__', 'walked', 2.0)
+    assert levenshtein('ab', 'b') == ('ab', '_b', 1.0)
+    assert levenshtein('abc', '', delcost=2.0) == ('abc', '___', 3.0)
+    assert levenshtein('', 'abc', inscost=3.0) == ('___', 'abc', 3.0)
+
+    # Substitution over insertion over deletion, when they cost the same
+    assert levenshtein('ab', 'ba') == ('ab', 'ba', 2.0)
+    assert levenshtein('ab', 'ba', substcost=3.0) == ('_ab', 'ba_', 2.0)
+
+    word = 'a' * 1500
+    assert levenshtein(word, word + 'bbb') == (word + '___', word + 'bbb', 3.0)
+    assert levenshtein('abc' * 400, 'abd' * 400)[2] == 400.0
+
+
+def test_levenshtein_many():
+    """
+    Tests that the bit-parallel distances are the plain edit distances, and
+    that the ones beyond max_distance are given up on
+    """
+    def expected(query, candidates, max_distance=None):
+        distances = [edit_distance(query, candidate) for candidate in candidates]
+        return([distance if max_distance is None or distance <= max_distance
+                else None for distance in distances])
+
+    candidates = ['sitting', 'kitten', '', 'k', 'mittens', 'written', 'sitten']
+    for query in ('kitten', 'k', 'ab' * 40, ''):
+        for max_distance in (None, 0, 1, 3):
+            assert levenshtein_many(query, candidates, max_distance) == \
+                expected(query, candidates, max_distance)
+    assert levenshtein_many('', ['', 'ab', 'abc'], 2) == [0, 2, None]
+
+    generator = random.Random(0)
+    for _ in range(300):
+        query = ''.join(generator.choice('abc') for _ in range(generator.randint(0, 70)))
+        candidates = [''.join(generator.choice('abcd') for _ in range(generator.randint(0, 70)))
+                      for _ in range(5)]
+        max_distance = generator.choice([None, 0, 2, 10, 40])
+        assert levenshtein_many(query, candidates, max_distance) == \
+            expected(query, candidates, max_distance)
+
+
+def test_levenshtein_bounded():
+    """
+    Tests the edges of the bound: negative bounds, lengths too far apart, the
+    shortcut once the common prefix and suffix are left out, and distances
+    right at the bound and just beyond it
+    """
+    assert levenshtein_bounded('walk', 'walk', -1) is None
+    assert levenshtein_bounded('', '', -1) is None
+    assert levenshtein_bounded('walk', 'walk', 0) == 0
+
+    # Lengths differing by more than the bound, whatever the rest
+    assert levenshtein_bounded('walk', 'walked', 1) is None
+    assert levenshtein_bounded('walk', 'walked', 2) == 2
+    assert levenshtein_bounded('', 'abc', 2) is None
+
+    # One string left empty once the common prefix and suffix are left out
+    assert levenshtein_bounded('walking', 'walkedking', 3) == 3
+    assert levenshtein_bounded('sing', 'sing', 5) == 0
+    assert levenshtein_bounded('abcd', 'ad', 2) == 2
+
+    # Right at the bound, and just beyond it
+    assert levenshtein_bounded('kitten', 'sitting', 3) == 3
+    assert levenshtein_bounded('kitten', 'sitting', 2) is None
+    for (s, t) in (('flaw', 'lawn'), ('intention', 'execution'), ('abcdef', 'badcfe')):
+        distance = edit_distance(s, t)
+        assert levenshtein_bounded(s, t, distance) == distance
+        assert levenshtein_bounded(s, t, distance + 1) == distance
+        assert levenshtein_bounded(s, t, distance - 1) is None
+
+
+def test_lcs():
+    """
+    Tests that the longest common substring is matched literally, is the
+    earliest one in s1 among those of the same length, and leaves out
+    parentheses, as a brute force search does
+    """
+    def brute_force(s1, s2):
+        s1 = s1.replace('(', '').replace(')', '')
+        s2 = s2.replace('(', '').replace(')', '')
+        for length in range(len(s1), 0, -1):
+            for start in range(len(s1) - length + 1):
+                if s1[start:start + length] in s2:
+                    return(s1[start:start + length])
+        return('')
+
+    assert lcs('a.b+c', 'x.b+y') == '.b+'
+    assert lcs('a*b', 'aab') == 'a'
+    assert lcs('[ab]', 'x[ab]') == '[ab]'
+    assert lcs('abxcd', 'cdyab') == 'ab'
+    assert lcs('(ab)c', 'xabx') == 'ab'
+    assert lcs('a(b)c', 'abc') == 'abc'
+    assert lcs('abc', 'xyz') == ''
+    assert lcs('', 'abc') == ''
+
+    generator = random.Random(0)
+    for _ in range(300):
+        s1 = ''.join(generator.choice('ab.*()') for _ in range(generator.randint(0, 12)))
+        s2 = ''.join(generator.choice('ab.*()') for _ in range(generator.randint(0, 12)))
+        assert lcs(s1, s2) == brute_force(s1, s2)
+
+    assert iterLCS({'source': 'sing', 'target': 'sang'}) == \
+        {'source': 'sing', 'target': 'sang', 'common': ['ng'],
+         'deleted': ['si'], 'added': ['sa']}
+    assert iterLCS({'source': 'Europeanize', 'target': 'Europeanizing'}) == \
+        {'source': 'Europeanize', 'target': 'Europeanizing', 'common': ['Europeaniz'],
+         'deleted': ['e'], 'added': ['ing']}
+    for (source, _, dest) in fetch_input_output_pairs(language='english', quality='low'):
+        assert lcs(source, dest) == brute_force(source, dest)